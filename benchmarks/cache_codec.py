@@ -0,0 +1,75 @@
+""" Compression ratio and decode throughput of the ccb cache format against csv, on a year of synthetic 1m candles,
+then the same for a month of candles appended one by one (as the cache updater does), run from the root of a
+checkout:
+
+    PYTHONPATH=. python benchmarks/cache_codec.py [n_candles] [n_appends]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from ccbacktest.data import codec
+from ccbacktest.data.caching import write_data, append_data, read_data
+
+
+def make_candles(n):
+    """ candles with the precision of exchange data: prices on a 0.01 tick and volumes on a 1e-6 lot
+    """
+    open_time = 1_577_836_800_000 + np.arange(n, dtype=np.int64) * 60_000
+    close = np.round(10_000 * np.exp(np.cumsum(np.random.randn(n) * 1e-3)), 2)
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.round(np.abs(np.random.randn(n)) * 5, 2)
+    return pd.DataFrame({'open_time': open_time, 'open': open_,
+                         'high': np.maximum(open_, close) + spread, 'low': np.minimum(open_, close) - spread,
+                         'close': close, 'volume': np.round(np.random.exponential(10, n), 6)})
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+
+def main(n):
+    df = make_candles(n)
+    raw_size = df.shape[0] * df.shape[1] * 8
+    csv = df.to_csv(index=False).encode()
+    csv_time = best_of(lambda: pd.read_csv(io.BytesIO(csv), dtype={'open_time': 'int64'}))
+    print(f'{n} candles, {raw_size / 1e6:.1f} MB in memory')
+    print(f'{"format":<10}{"size (MB)":>12}{"ratio":>10}{"encode (s)":>12}{"decode (s)":>12}{"decode MB/s":>14}')
+    print(f'{"csv":<10}{len(csv) / 1e6:>12.2f}{raw_size / len(csv):>10.2f}{"":>12}{csv_time:>12.3f}'
+          f'{raw_size / 1e6 / csv_time:>14.0f}')
+    for name in codec.available_codecs():
+        encode_time = best_of(lambda: codec.encode(df, name))
+        encoded = codec.encode(df, name)
+        decode_time = best_of(lambda: codec.decode(encoded))
+        print(f'{"ccb-" + name:<10}{len(encoded) / 1e6:>12.2f}{raw_size / len(encoded):>10.2f}{encode_time:>12.3f}'
+              f'{decode_time:>12.3f}{raw_size / 1e6 / decode_time:>14.0f}')
+
+
+def appends(n):
+    df = make_candles(n)
+    print(f'\n{n} candles appended one by one')
+    print(f'{"format":<10}{"size (MB)":>12}{"append (ms)":>12}{"decode (s)":>12}')
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ['csv', 'ccb']:
+            path = os.path.join(directory, f'candles.{name}')
+            status = {'format': name, 'n_bytes': write_data(path, df.iloc[:1])}
+            t = time.perf_counter()
+            for i in range(1, n):
+                status['n_bytes'] = append_data(path, df.iloc[i:i + 1], status)
+            append_time = (time.perf_counter() - t) / (n - 1)
+            decode_time = best_of(lambda: read_data(path, status))
+            print(f'{name:<10}{status["n_bytes"] / 1e6:>12.2f}{append_time * 1000:>12.3f}{decode_time:>12.3f}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 525_600)
+    appends(int(sys.argv[2]) if len(sys.argv) > 2 else 43_200)
@@ -8,7 +8,8 @@ class Backend(abc.ABC):
     """
 
     @abc.abstractmethod
-    def get_historical_data(self, ticker: str, freq: str, start: pd.datetime, end: pd.datetime = None) -> pd.DataFrame:
+    def get_historical_data(self, ticker: str, freq: str, start: pd.Timestamp,
+                            end: pd.Timestamp = None) -> pd.DataFrame:
         pass
 
     @abc.abstractmethod
@@ -16,7 +17,7 @@ class Backend(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def download(self, ticker: str, freq: str, start: pd.datetime, end: pd.datetime = None) -> pd.DataFrame:
+    def download(self, ticker: str, freq: str, start: pd.Timestamp, end: pd.Timestamp = None) -> pd.DataFrame:
         pass
 
 
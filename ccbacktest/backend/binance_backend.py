@@ -1,48 +1,44 @@
-import ccxt
-from ccbacktest.backend.backend import Backend
-from ccbacktest.data.caching import cache_download
-import pandas as pd
 import time
-
-
-class BinanceBackend(Backend):
-    def __init__(self, exchange: ccxt.binance):
-        self.exchange = exchange
-        self._data_names = ['open_time', 'open', 'high', 'low', 'close', 'volume']
-
-    def get_historical_data(self, ticker: str, freq: str, start: pd.datetime,
-                            end: pd.datetime = None) -> pd.DataFrame:
-        pass
-
-    def historical_ohlcv(self, symbol, start, end, timeframe='1m'):
-        since = start
-        total_df = pd.DataFrame()
+from ccbacktest.backend.ccxt_backend import CCXTBackend
+from ccbacktest.data.trades import TradeStore, trades_from_ccxt, _to_ms
+from ccbacktest.utils.lazy import lazy_import
+
+# ccxt takes longer to import than the rest of the package, it's only loaded when an exchange is needed
+ccxt = lazy_import('ccxt')
+
+
+class BinanceBackend(CCXTBackend):
+    """
+    The binance exchange through ccxt, with the download of its trades: binance trade ids are consecutive integers
+    and a `fetch_trades` request returns the trades of at most one hour after `since`
+    """
+
+    def __init__(self, exchange: 'ccxt.binance' = None, **kwargs):
+        if exchange is None:
+            exchange = ccxt.binance()
+        super(BinanceBackend, self).__init__(exchange, name='binance', **kwargs)
+
+    def download_trades(self, ticker: str, start, end=None, limit: int = 1000, window: int = 3600_000) -> TradeStore:
+        """ fetch the trades between start and end into the local trade store, resuming after the last stored trade
+        :arg window: milliseconds of trades binance returns at most for one request (it queries one hour after
+        `since`), a short or empty page only means this window is exhausted
+        :return: the trade store of the ticker
+        """
+        store = TradeStore(self.name, ticker)
+        status = store.status
+        since = _to_ms(start)
+        if status['last_time'] is not None:
+            since = max(since, status['last_time'])
+        end = int(time.time() * 1000) if end is None else _to_ms(end)
         while since <= end:
-            print('rr ss')
-            df = pd.DataFrame(self.exchange.fetch_ohlcv(symbol, since=since, timeframe=timeframe),
-                              columns=self._data_names)
-            total_df = pd.concat([total_df, df])
-            if df.shape[0] == 0:
-                return total_df[(total_df.open_time >= start) & (total_df.open_time <= end)]
-            since = total_df['open_time'].max() + 1
-        return total_df[(total_df.open_time >= start) & (total_df.open_time <= end)]
-
-    def get_tick_data(self):
-        pass
-
-    @cache_download("binance")
-    def _download(self, ticker: str, timeframe: str,
-                  start: pd.datetime, end: pd.datetime = None,
-                  format: str = None) -> pd.DataFrame:
-
-        data = self.historical_ohlcv(ticker, start, end, timeframe=timeframe)
-        return data
-
-    def download(self, ticker: str, timeframe: str,
-                 start: pd.datetime, end: pd.datetime = None,
-                 format: str = None) -> pd.DataFrame:
-
-        data = self._download(ticker, timeframe, start, end, format)
-        data['open_time'] = pd.to_datetime(data['open_time'], unit='ms')
-        data.set_index('open_time', inplace=True)
-        return data
+            trades = self.call(self.exchange.fetch_trades, ticker, since=since, limit=limit)
+            records = trades_from_ccxt(trades)
+            records = records[(records['time'] >= since) & (records['time'] <= end)]
+            store.append(records)
+            if len(trades) >= limit and records.shape[0] > 0:
+                # trades of the same millisecond may be split between pages, the store drops the ones it already has
+                since = max(int(records['time'].max()), since + 1)
+            else:
+                last = int(records['time'].max()) + 1 if records.shape[0] > 0 else since
+                since = max(since + window, last)
+        return store
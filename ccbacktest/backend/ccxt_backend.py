@@ -0,0 +1,158 @@
+from concurrent.futures import ThreadPoolExecutor
+from ccbacktest.backend.backend import Backend
+from ccbacktest.data.caching import cache_download
+from ccbacktest.utils.lazy import lazy_import
+from ccbacktest.utils.rate_limit import RateLimiter
+import numpy as np
+import pandas as pd
+import sys
+import time
+
+ccxt = lazy_import('ccxt')
+
+# every exchange's candles are normalized to this schema
+OHLCV_DTYPE = np.dtype([('open_time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                        ('volume', '<f8')])
+
+
+def normalize_ohlcv(rows: list) -> np.ndarray:
+    """ convert the candles returned by a ccxt exchange's `fetch_ohlcv` to OHLCV_DTYPE records sorted by open time,
+    missing values (None) become NaN and extra fields some exchanges add are dropped
+    """
+    records = np.empty(len(rows), dtype=OHLCV_DTYPE)
+    if len(rows) == 0:
+        return records
+    values = np.array([row[:6] for row in rows], dtype=np.float64)
+    records['open_time'] = values[:, 0].astype(np.int64)
+    for i, name in enumerate(OHLCV_DTYPE.names[1:]):
+        records[name] = values[:, i + 1]
+    if (np.diff(records['open_time']) <= 0).any():
+        _, index = np.unique(records['open_time'], return_index=True)
+        records = records[index]
+    return records
+
+
+class CCXTBackend(Backend):
+    """
+    A backend for any exchange supported by ccxt: the candles are fetched page by page through a shared rate limiter
+    with retries on network errors, normalized to OHLCV_DTYPE, and cached under the exchange's id.
+
+        backend = CCXTBackend('kraken')
+        data = backend.download('BTC/USD', '1h', '2021-01-01', '2021-02-01')
+    """
+    _data_names = list(OHLCV_DTYPE.names)
+
+    def __init__(self, exchange, name: str = None, limit: int = None, retries: int = 3, backoff: float = 1.,
+                 rate_limit=None, retry_exceptions=None, refetch_gaps=False, sleep=time.sleep):
+        """
+        :arg exchange: a ccxt exchange instance, or the id of the exchange to create
+        :arg name: name of the backend in the cache, the exchange's id by default
+        :arg limit: number of candles per request, the exchange's default if None
+        :arg retries: number of times a request is retried after a network error
+        :arg backoff: seconds to wait before the first retry, doubled at each retry
+        :arg rate_limit: minimum number of milliseconds between two requests, defaults to exchange.rateLimit
+        :arg retry_exceptions: exceptions that are retried, ccxt.NetworkError by default (ConnectionError and
+        TimeoutError if ccxt isn't imported)
+        :arg refetch_gaps: download once more the missing candles found in a download (see cache_download)
+        """
+        if isinstance(exchange, str):
+            exchange = getattr(ccxt, exchange)()
+        self.exchange = exchange
+        self.name = name if name is not None else exchange.id
+        self._limit = limit
+        self._retries = retries
+        self._backoff = backoff
+        self._retry_exceptions = retry_exceptions
+        self._sleep = sleep
+        self.refetch_gaps = refetch_gaps
+        if rate_limit is None:
+            rate_limit = getattr(exchange, 'rateLimit', 0)
+        self.rate_limiter = RateLimiter(rate_limit, sleep=sleep)
+
+    @property
+    def retry_exceptions(self):
+        # only resolved when an exception is raised, an exchange that isn't from ccxt (a fake one in the tests) must
+        # not import ccxt here: a ModuleNotFoundError would hide the exception being handled
+        if self._retry_exceptions is None:
+            if 'ccxt' in sys.modules:
+                return ccxt.NetworkError
+            return ConnectionError, TimeoutError
+        return self._retry_exceptions
+
+    def get_historical_data(self, ticker: str, freq: str, start: pd.Timestamp,
+                            end: pd.Timestamp = None) -> pd.DataFrame:
+        return self.download(ticker, freq, start, end)
+
+    def get_tick_data(self):
+        pass
+
+    def call(self, method, *args, **kwargs):
+        """ call an exchange method within the rate limit, retrying on network errors with an exponential backoff
+        """
+        delay = self._backoff
+        for attempt in range(self._retries + 1):
+            self.rate_limiter.wait()
+            try:
+                return method(*args, **kwargs)
+            except self.retry_exceptions:
+                if attempt == self._retries:
+                    raise
+                self._sleep(delay)
+                delay *= 2
+
+    def fetch_page(self, symbol, timeframe, since) -> np.ndarray:
+        """ fetch one page of candles starting at `since` (ms)
+        """
+        return normalize_ohlcv(self.call(self.exchange.fetch_ohlcv, symbol, timeframe=timeframe, since=since,
+                                          limit=self._limit))
+
+    def iter_ohlcv(self, symbol, start, end, timeframe='1m'):
+        """ fetch the candles between start and end (ms, inclusive), yielding each page as soon as it's fetched
+        """
+        since = start
+        while since <= end:
+            page = self.fetch_page(symbol, timeframe, since)
+            page = page[page['open_time'] >= since]
+            if page.shape[0] == 0:
+                return
+            yield page[page['open_time'] <= end]
+            since = int(page['open_time'][-1]) + 1
+
+    def historical_ohlcv(self, symbol, start, end, timeframe='1m') -> pd.DataFrame:
+        """ every candle between start and end (ms, inclusive) in one data frame, the pages are kept in memory until
+        the last one is fetched (cache_download validates and merges a downloaded range at once)
+        """
+        pages = list(self.iter_ohlcv(symbol, start, end, timeframe=timeframe))
+        records = np.concatenate(pages) if len(pages) > 0 else np.empty(0, dtype=OHLCV_DTYPE)
+        return pd.DataFrame(records)
+
+    @cache_download()
+    def _download(self, ticker: str, timeframe: str,
+                  start: pd.Timestamp, end: pd.Timestamp = None,
+                  format: str = None) -> pd.DataFrame:
+
+        data = self.historical_ohlcv(ticker, start, end, timeframe=timeframe)
+        return data
+
+    def download(self, ticker: str, timeframe: str,
+                 start: pd.Timestamp, end: pd.Timestamp = None,
+                 format: str = None) -> pd.DataFrame:
+
+        data = self._download(ticker, timeframe, start, end, format)
+        data['open_time'] = pd.to_datetime(data['open_time'], unit='ms')
+        data.set_index('open_time', inplace=True)
+        return data
+
+
+def download_many(requests, max_workers=8) -> list:
+    """ download concurrently a universe of candles, possibly from different exchanges, each backend keeps its
+    requests within its own rate limit, requests of the same ticker and timeframe wait for each other on the cache
+    lock (see caching.cache_lock)
+    :arg requests: iterable of (backend, ticker, timeframe, start, end) tuples
+    :return: the data frames, in the order of the requests
+    """
+    requests = list(requests)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(backend.download, ticker, timeframe, start, end)
+                   for backend, ticker, timeframe, start, end in requests]
+        return [future.result() for future in futures]
@@ -0,0 +1,135 @@
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from ccbacktest.data import caching
+from ccbacktest.data.caching import (cache_paths, cache_lock, read_status, write_status, read_data, write_data, append_data,
+                                     data_exists, stored_format, merge_sorted, validate_ohlcv,
+                                     _time_frame_to_ms_or_none)
+
+# names of the kline archives published on data.binance.vision, monthly (BTCUSDT-1m-2021-01.zip) or daily
+# (BTCUSDT-1m-2021-01-31.zip)
+_ARCHIVE_NAME = re.compile(r'^(?P<symbol>[A-Z0-9]+)-(?P<timeframe>\w+)-(?P<date>\d{4}-\d{2}(-\d{2})?)\.zip$')
+_data_names = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+# open times above this value are in microseconds (spot archives since 2025)
+_MAX_MS = 10 ** 14
+
+
+def parse_archive(path) -> pd.DataFrame:
+    """ read the candles of a zipped kline csv, with or without a header line, and with open times in ms or us
+    """
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(archive.namelist()[0]) as f:
+            first = f.readline()
+            has_header = not first[:1].isdigit()
+        with archive.open(archive.namelist()[0]) as f:
+            df = pd.read_csv(f, header=None, skiprows=1 if has_header else 0, usecols=range(6), names=_data_names,
+                             dtype={'open_time': 'int64'})
+    microseconds = df.open_time.values >= _MAX_MS
+    if microseconds.any():
+        df.loc[microseconds, 'open_time'] //= 1000
+    return df
+
+
+def find_archives(directory, ticker, timeframe):
+    """ archives of a ticker in a directory, sorted by period, a daily archive covered by a monthly one is skipped
+    """
+    symbol = ticker.replace('/', '')
+    monthly, daily = {}, {}
+    for name in os.listdir(directory):
+        match = _ARCHIVE_NAME.match(name)
+        if match is None or match['symbol'] != symbol or match['timeframe'] != timeframe:
+            continue
+        date = match['date']
+        (monthly if len(date) == 7 else daily)[date] = os.path.join(directory, name)
+    paths = dict(monthly)
+    for date, path in daily.items():
+        if date[:7] not in monthly:
+            paths[date] = path
+    return [paths[date] for date in sorted(paths)]
+
+
+def import_archives(directory, ticker: str, timeframe: str, backend: str = 'binance', max_workers=None) -> int:
+    """ import a directory of kline archives into the cache, the archives are parsed in parallel and streamed into
+    the cache in chronological order: candles after the cached ones are appended, the others are merged into the
+    cache in one write at the end. The downloaded intervals of the cache status are updated, so that later
+    downloads only ask the exchange for what the archives didn't cover
+    :arg ticker: the ticker as used by the backend, 'BTC/USDT' for the BTCUSDT archives
+    :arg max_workers: number of processes parsing the archives, the number of cores by default
+    :return: number of imported candles
+    """
+    paths = find_archives(directory, ticker, timeframe)
+    if len(paths) == 0:
+        return 0
+    step = _time_frame_to_ms_or_none(timeframe)
+    path, json_path = cache_paths(backend, ticker, timeframe)
+    with cache_lock(json_path):
+        status = read_status(json_path)
+        if status is None or not data_exists(path, status):
+            status = {'already_downloaded': [], 'format': caching.CACHE_FORMAT}
+        covered = status['already_downloaded']
+        last = covered[-1] if len(covered) > 0 else None
+        to_merge = []
+        n_imported = 0
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for df in executor.map(parse_archive, paths):
+                df = df[~_is_covered(df.open_time.values, covered)]
+                if df.shape[0] == 0:
+                    continue
+                report = validate_ohlcv(df.open_time.values, step)
+                if report['n_out_of_order'] > 0 or report['n_duplicates'] > 0:
+                    df = df.sort_values(by='open_time', kind='stable').drop_duplicates(subset=['open_time'])
+                first_time, last_time = int(df.open_time.iat[0]), int(df.open_time.iat[-1])
+                covered = _add_interval(covered, first_time, last_time, step)
+                status['already_downloaded'] = covered
+                if len(to_merge) == 0 and (last is None or first_time > last):
+                    status['n_bytes'] = append_data(path, df, status)
+                    status['format'] = stored_format(path, status)
+                    times = df.open_time.values if last is None else np.r_[last, df.open_time.values]
+                    gaps = validate_ohlcv(times, step, coverage=covered)['gaps']
+                    status['gaps'] = status.get('gaps', []) + gaps
+                    last = last_time
+                else:
+                    to_merge.append(df)
+                if len(to_merge) == 0:
+                    # the status is committed after each append, an interrupted import keeps what was imported
+                    write_status(json_path, status)
+                n_imported += df.shape[0]
+        if len(to_merge) > 0:
+            df = merge_sorted(read_data(path, status) if data_exists(path, status) else None, to_merge)
+            report = validate_ohlcv(df.open_time.values, step, df.volume.values, coverage=covered)
+            status['gaps'] = report['gaps']
+            status['zero_volume'] = report['zero_volume']
+            status['n_bytes'] = write_data(path, df, status)
+            status['format'] = caching.CACHE_FORMAT
+            write_status(json_path, status)
+        return n_imported
+
+
+def _is_covered(times: np.ndarray, covered) -> np.ndarray:
+    """ whether each time falls in one of the covered intervals (flat representation)
+    """
+    if len(covered) == 0:
+        return np.zeros(times.shape[0], dtype=bool)
+    covered = np.asarray(covered, dtype=np.int64)
+    i = np.searchsorted(covered, times, side='right')
+    inside = i % 2 == 1
+    # the end of an interval is covered as well
+    on_end = (i > 0) & (covered[np.maximum(i - 1, 0)] == times)
+    return inside | on_end
+
+
+def _add_interval(covered, first, last, step):
+    """ add [first, last] to the covered intervals (flat representation), joining the intervals that overlap or that
+    are only one candle apart
+    """
+    intervals = sorted([covered[i:i + 2] for i in range(0, len(covered), 2)] + [[first, last]])
+    merged = [list(intervals[0])]
+    for start, end in intervals[1:]:
+        if start <= merged[-1][1] + (step or 0):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [t for interval in merged for t in interval]
@@ -1,64 +1,388 @@
+import numpy as np
 import pandas as pd
 import os
 import pathlib
 import json
+import io
 import time
+import tempfile
+import threading
+import contextlib
+try:
+    import fcntl
+except ImportError:  # windows, only the threads of a process are synchronized
+    fcntl = None
+from ccbacktest.data import codec
+from ccbacktest.data.data_loader import _time_frame_to_ms
 
+CACHE_DIRECTORY = 'data/.historical_data'
+# format of the data files: 'ccb' (compressed blocks, see ccbacktest.data.codec) or 'csv'
+CACHE_FORMAT = 'ccb'
+# compression codec of the ccb files, the fastest available one if None
+CACHE_CODEC = None
+# blocks of a ccb file with fewer rows than BLOCK_ROWS are small, once COMPACT_BLOCKS of them follow each other at
+# the end of the file (one per append of the updater for example), they are merged into one block
+BLOCK_ROWS = 1 << 13
+COMPACT_BLOCKS = 16
 
-def cache_download(backend: str):
+
+def cache_paths(backend: str, ticker: str, freq: str):
+    """ path of the data file (in the CACHE_FORMAT format) and of the json status file where a ticker is cached,
+    creating the directory
+    :return: (data path, status path)
+    """
+    base, symbol = ticker.split('/')
+    directory = '{}/{}/{}'.format(CACHE_DIRECTORY, backend, base)
+    path = pathlib.Path(directory)
+    if not path.exists():
+        path.mkdir(parents=True, exist_ok=True)
+    return (os.path.join(directory, f'{symbol}-{freq}.{CACHE_FORMAT}'),
+            os.path.join(directory, f'{symbol}-{freq}.json'))
+
+
+def _stored_path(path, status):
+    """ the data file actually written, the cache may still be in the format recorded in its status (csv for
+    caches written before the format was recorded) until the next full write converts it
+    """
+    stored_format = status.get('format', 'csv') if status is not None else _format(path)
+    return os.path.splitext(path)[0] + '.' + stored_format
+
+
+def stored_format(path, status):
+    return _format(_stored_path(path, status))
+
+
+def _format(path):
+    return os.path.splitext(path)[1][1:]
+
+
+class _KeyLock(object):
+    """ lock of one cache key, reentrant within a thread, the file lock is taken by the outermost acquisition
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.file = None
+
+
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def cache_lock(json_path):
+    """ hold the lock of a cache key (given by its status path) across threads and processes, every
+    read-modify-write of the data and status files of a key is done under it
+    """
+    lock_path = os.path.splitext(os.path.abspath(json_path))[0] + '.lock'
+    with _key_locks_lock:
+        key_lock = _key_locks.setdefault(lock_path, _KeyLock(lock_path))
+    with key_lock.lock:
+        if key_lock.depth == 0 and fcntl is not None:
+            key_lock.file = open(lock_path, 'a')
+            fcntl.flock(key_lock.file.fileno(), fcntl.LOCK_EX)
+        key_lock.depth += 1
+        try:
+            yield
+        finally:
+            key_lock.depth -= 1
+            if key_lock.depth == 0 and key_lock.file is not None:
+                fcntl.flock(key_lock.file.fileno(), fcntl.LOCK_UN)
+                key_lock.file.close()
+                key_lock.file = None
+
+
+def _temporary_path(path):
+    """ a new temporary file next to `path`, so that it can replace it atomically
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or '.')
+    os.close(fd)
+    return tmp_path
+
+
+@contextlib.contextmanager
+def _replacing(path):
+    """ yield a temporary path that replaces `path` when the block succeeds, and is removed otherwise
+    """
+    tmp_path = _temporary_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_status(json_path):
+    if not os.path.exists(json_path):
+        return None
+    with open(json_path, 'r') as jf:
+        return json.load(jf)
+
+
+def write_status(json_path, status):
+    """ atomically replace the status file, the status is the commit point of every write to the data file
+    """
+    with _replacing(json_path) as tmp_path:
+        with open(tmp_path, 'w') as jf:
+            json.dump(status, jf)
+
+
+def data_exists(path, status=None):
+    return os.path.exists(_stored_path(path, status))
+
+
+def read_data(path, status=None):
+    """ read the data file, ignoring the bytes of an unfinished append
+    """
+    path = _stored_path(path, status)
+    n_bytes = status.get('n_bytes') if status is not None else None
+    if _format(path) == 'ccb':
+        return codec.read(path, n_bytes)
+    if n_bytes is None or n_bytes >= os.path.getsize(path):
+        return pd.read_csv(path, dtype={"open_time": 'int64'})
+    with open(path, 'rb') as f:
+        return pd.read_csv(io.BytesIO(f.read(n_bytes)), dtype={"open_time": 'int64'})
+
+
+def write_data(path, df, status=None):
+    """ atomically replace the data file, in the format given by its extension, the file in the previous format
+    of the status is removed
+    :return: the size of the written file in bytes, to be recorded in the status with the format
+    """
+    with _replacing(path) as tmp_path:
+        if _format(path) == 'ccb':
+            with open(tmp_path, 'wb') as f:
+                f.write(codec.encode(df, CACHE_CODEC))
+        else:
+            df.to_csv(tmp_path, index=False)
+    previous = _stored_path(path, status)
+    if previous != path and os.path.exists(previous):
+        os.remove(previous)
+    return os.path.getsize(path)
+
+
+def append_data(path, df, status):
+    """ append rows to the data file (in the format it's stored in), a partial write left by a previous crash
+    (bytes after the size recorded in the status) is truncated first. The small blocks appended at the end of a ccb
+    file are regularly merged (see COMPACT_BLOCKS) so that the file doesn't end up as one block per append
+    :return: the size of the data file in bytes, to be recorded in the status once it's written
+    """
+    path = _stored_path(path, status)
+    if not os.path.exists(path):
+        return write_data(path, df)
+    n_bytes = status.get('n_bytes') if status is not None else None
+    if _format(path) == 'ccb':
+        compacted = _compact_tail(path, df, n_bytes)
+        if compacted is not None:
+            return compacted
+        encoded = codec.encode(df, CACHE_CODEC)
+    else:
+        encoded = df.to_csv(index=False, header=False).encode()
+    with open(path, 'r+b') as f:
+        if n_bytes is not None:
+            f.truncate(n_bytes)
+        f.seek(0, os.SEEK_END)
+        f.write(encoded)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def _compact_tail(path, df, n_bytes):
+    """ if the ccb file ends with COMPACT_BLOCKS small blocks, replace it by a copy where they are merged with the
+    appended rows, the large blocks before them are copied without being decoded
+    :return: the size of the new file, None if the tail is not fragmented enough
+    """
+    with open(path, 'rb') as f:
+        tail_start, n_small = 0, 0
+        for offset, end, n in codec.iter_blocks(f, n_bytes):
+            if n < BLOCK_ROWS:
+                n_small += 1
+            else:
+                tail_start, n_small = end, 0
+        if n_small + 1 < COMPACT_BLOCKS:
+            return None
+        committed = f.seek(0, os.SEEK_END) if n_bytes is None else n_bytes
+        f.seek(tail_start)
+        tail = codec.decode(f.read(committed - tail_start))
+        tail = pd.concat([tail, df], ignore_index=True)
+        with _replacing(path) as tmp_path:
+            with open(tmp_path, 'wb') as out:
+                f.seek(0)
+                remaining = tail_start
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 1 << 24))
+                    out.write(chunk)
+                    remaining -= len(chunk)
+                for i in range(0, tail.shape[0], BLOCK_ROWS):
+                    out.write(codec.encode(tail.iloc[i:i + BLOCK_ROWS], CACHE_CODEC))
+                out.flush()
+                os.fsync(out.fileno())
+    return os.path.getsize(path)
+
+
+def cache_bounds(start, end=None, format: str = None):
+    """ convert the bounds of a download to the milliseconds timestamps used in the cache, the end defaults to now
+    """
+    start = pd.to_datetime(start, format=format)
+    start = int(time.mktime(start.timetuple())) * 1000
+    if end is not None:
+        end = pd.to_datetime(end, format=format)
+        end = int(time.mktime(end.timetuple())) * 1000
+    else:
+        end = int(time.time() * 1000)
+    return start, end
+
+
+def cache_download(backend: str = None, refetch_gaps: bool = None):
+    """ cache the candles returned by a backend's download method, only the ranges missing from the cache are
+    downloaded, and they are validated (see validate_ohlcv) before being merged into the cache
+    :arg backend: name of the backend in the cache, the `name` attribute of the backend instance if None
+    :arg refetch_gaps: download once more the ranges of newly detected gaps (missing candles), the
+    `refetch_gaps` attribute of the backend instance (False if it has none) if None
+    """
     def cache(func):
         def wrapper(self, ticker: str, freq: str, start_str, end_str, format: str = None):
-            base, symbol = ticker.split('/')
-            directory = 'data/.historical_data/{}/{}'.format(backend, base)
-            path = pathlib.Path(directory)
-            if not path.exists():
-                path.mkdir(parents=True, exist_ok=True)
-            start_str = pd.to_datetime(start_str, format=format)
-            start = int(time.mktime(start_str.timetuple())) * 1000
-            if end_str is not None:
-                end_str = pd.to_datetime(end_str, format=format)
-                end = int(time.mktime(end_str.timetuple())) * 1000
-            else:
-                end = int(time.time() * 1000)
-                end_str = pd.to_datetime(int(time.time() * 1000), unit="ms")
-
-            csv_path = os.path.join(directory, f'{symbol}-{freq}.csv')
-            json_path = os.path.join(directory, f'{symbol}-{freq}.json')
-            if os.path.exists(csv_path) and os.path.exists(json_path):
-                df = pd.read_csv(csv_path, dtype={"open_time": 'int64'})
-                with open(json_path, 'r') as jf:
-                    status = json.load(jf)
-                already_downloaded = status['already_downloaded']
-                to_download, updated = get_diff_and_update([start, end], already_downloaded)
-                dfs = [df]
-                for part in to_download:
-                    print(part)
-                    df = func(self, ticker, freq, *part)
-                    dfs.append(df)
-                df = pd.concat(dfs)
-                df = df.sort_values(by="open_time").drop_duplicates(subset=['open_time'])
-                new_end = int(df.open_time.max())
-                updated[-1] = new_end
-                updated[0] = int(df.open_time.min())
+            start, end = cache_bounds(start_str, end_str, format)
+            step = _time_frame_to_ms_or_none(freq)
+            path, json_path = cache_paths(backend if backend is not None else self.name, ticker, freq)
+            # concurrent downloads of the same key (download_many, an updater) run one after the other, the later
+            # ones only download what is still missing
+            with cache_lock(json_path):
+                status = read_status(json_path)
+                if status is not None and data_exists(path, status):
+                    df = read_data(path, status)
+                    to_download, updated = get_diff_and_update([start, end], status['already_downloaded'])
+                    if len(to_download) == 0:
+                        return df[(start <= df.open_time) & (df.open_time <= end)]
+                else:
+                    status = {}
+                    df = None
+                    to_download, updated = [[start, end]], [start, end]
+                parts = [_ingest(func(self, ticker, freq, *part), step, status) for part in to_download]
+                df = merge_sorted(df, parts)
+                if df.shape[0] == 0:
+                    return df
+                updated[-1] = int(df.open_time.iat[-1])
+                updated[0] = int(df.open_time.iat[0])
+                report = validate_ohlcv(df.open_time.values, step, df.volume.values, coverage=updated)
+                refetch = refetch_gaps if refetch_gaps is not None else getattr(self, 'refetch_gaps', False)
+                if refetch and step is not None:
+                    known = status.get('gaps', [])
+                    new_gaps = [gap for gap in report['gaps'] if gap not in known]
+                    if len(new_gaps) > 0:
+                        parts = [_ingest(func(self, ticker, freq, s, e), step, status) for s, e in new_gaps]
+                        df = merge_sorted(df, parts)
+                        report = validate_ohlcv(df.open_time.values, step, df.volume.values, coverage=updated)
                 status['already_downloaded'] = updated
-                with open(json_path, 'w') as jf:
-                    json.dump(status, jf)
-                df.to_csv(csv_path, index=False)
+                status['gaps'] = report['gaps']
+                status['zero_volume'] = report['zero_volume']
+                status['n_bytes'] = write_data(path, df, status)
+                status['format'] = CACHE_FORMAT
+                write_status(json_path, status)
                 return df[(start <= df.open_time) & (df.open_time <= end)]
-            else:
-                df = (func(self, ticker, freq, start, end)
-                      .sort_values(by='open_time').drop_duplicates(subset=['open_time']))
-                df.to_csv(csv_path, index=False)
-                json_file = {"already_downloaded": [int(df.open_time.min()), int(df.open_time.max())]}
-                with open(json_path, 'w') as jf:
-                    json.dump(json_file, jf)
-                return df
 
         return wrapper
 
     return cache
 
 
+def validate_ohlcv(open_time: np.ndarray, step=None, volume: np.ndarray = None, coverage=None) -> dict:
+    """ check the open times of candles with O(n) array operations
+    :arg step: duration of a candle in ms, the gaps are not computed if it's None
+    :arg coverage: downloaded intervals (flat representation), only the gaps inside them are reported
+    :return: dict with
+        - n_out_of_order: number of candles opening before the previous one
+        - n_duplicates: number of candles opening at the same time as the previous one
+        - n_misaligned: number of open times that are not a multiple of the step
+        - gaps: [first, last] open times of each range of missing candles
+        - zero_volume: [first, last] open times of each run of candles without volume
+    """
+    open_time = np.asarray(open_time, dtype=np.int64)
+    diff = np.diff(open_time)
+    report = {'n_out_of_order': int((diff < 0).sum()), 'n_duplicates': int((diff == 0).sum()),
+              'n_misaligned': 0, 'gaps': [], 'zero_volume': []}
+    if step is not None:
+        report['n_misaligned'] = int((open_time % step != 0).sum())
+        where = np.flatnonzero(diff > step)
+        first, last = open_time[where] + step, open_time[where + 1] - step
+        if coverage is not None and len(coverage) > 0:
+            coverage = np.asarray(coverage, dtype=np.int64)
+            i = np.searchsorted(coverage, first, side='right')
+            inside = (i % 2 == 1) & (last <= coverage[np.minimum(i, len(coverage) - 1)])
+            first, last = first[inside], last[inside]
+        report['gaps'] = [[int(f), int(l)] for f, l in zip(first, last)]
+    if volume is not None:
+        report['zero_volume'] = [[int(open_time[f]), int(open_time[l])] for f, l in _runs(np.asarray(volume) == 0)]
+    return report
+
+
+def merge_sorted(df, parts):
+    """ merge sorted and deduplicated parts into the sorted cached data without sorting it again, the parts are
+    expected to fill holes of the cache: the cached candles they overlap are replaced by the downloaded ones,
+    anything else falls back to a full sort
+    """
+    frames = [part for part in parts if part.shape[0] > 0]
+    if df is None or df.shape[0] == 0:
+        if len(frames) == 0:
+            # nothing to merge, the empty frame keeps the columns of the cache or of the downloaded parts
+            if df is None and len(parts) > 0:
+                return parts[0]
+            return df if df is not None else pd.DataFrame()
+        df, frames = frames[0], frames[1:]
+    times = df.open_time.values
+    pieces = []
+    position = 0
+    for part in sorted(frames, key=lambda p: p.open_time.iat[0]):
+        part_times = part.open_time.values
+        i = np.searchsorted(times, part_times[0], side='left')
+        j = np.searchsorted(times, part_times[-1], side='right')
+        if i < position or not np.isin(times[i:j], part_times).all():
+            return _sort_and_deduplicate(pd.concat([df] + frames))
+        pieces.extend([df.iloc[position:i], part])
+        position = j
+    pieces.append(df.iloc[position:])
+    return pd.concat(pieces, ignore_index=True)
+
+
+def _ingest(df, step, status):
+    """ sort and deduplicate a downloaded part if needed, keeping count of the invalid rows in the status
+    """
+    report = validate_ohlcv(df.open_time.values, step)
+    if report['n_misaligned'] > 0:
+        status['n_misaligned'] = status.get('n_misaligned', 0) + report['n_misaligned']
+    if report['n_out_of_order'] > 0 or report['n_duplicates'] > 0:
+        n = df.shape[0]
+        df = _sort_and_deduplicate(df)
+        status['n_out_of_order'] = status.get('n_out_of_order', 0) + report['n_out_of_order']
+        status['n_duplicates'] = status.get('n_duplicates', 0) + n - df.shape[0]
+    return df
+
+
+def _sort_and_deduplicate(df):
+    return df.sort_values(by='open_time', kind='stable').drop_duplicates(subset=['open_time'], keep='last')
+
+
+def _runs(mask: np.ndarray):
+    """ (first, last) indices of each run of True values
+    """
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    edges = np.diff(padded)
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1)
+
+
+def _time_frame_to_ms_or_none(freq):
+    try:
+        return _time_frame_to_ms(freq)
+    except ValueError:
+        return None
+
+
 # helpers
 def get_diff_and_update(v, a):
     assert (len(v) == 2)
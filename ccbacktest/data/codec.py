@@ -0,0 +1,149 @@
+import functools
+import json
+import os
+import struct
+import zlib
+import numpy as np
+import pandas as pd
+from ccbacktest.utils.lazy import lazy_import
+
+# A ccb file is a sequence of independent blocks, so that new candles can be appended without rewriting the file:
+#
+#   MAGIC | header length (uint32) | payload length (uint64) | json header | compressed payload
+#
+# the header holds the number of rows, the codec and the float columns. Before compression the payload is the
+# open times encoded as delta of delta (int64, almost only zeros for regular candles) followed by each float column
+# byte-shuffled (the i-th bytes of all the values are stored together, which groups the sign / exponent bytes)
+
+MAGIC = b'CCB1'
+_PREFIX = struct.Struct('<4sIQ')
+
+zstandard = lazy_import('zstandard')
+lz4_frame = lazy_import('lz4.frame')
+
+
+def _zstd():
+    return (lambda b: zstandard.ZstdCompressor(level=3).compress(b),
+            lambda b: zstandard.ZstdDecompressor().decompress(b))
+
+
+def _lz4():
+    return lz4_frame.compress, lz4_frame.decompress
+
+
+def _zlib():
+    return (lambda b: zlib.compress(b, 6)), zlib.decompress
+
+
+_CODECS = {'zstd': _zstd, 'lz4': _lz4, 'zlib': _zlib}
+
+
+@functools.lru_cache(maxsize=None)
+def available_codecs():
+    """ codecs that can be used in this environment, the fastest first, zlib is always available
+    """
+    codecs = []
+    for name in _CODECS:
+        try:
+            _CODECS[name]()[0](b'')
+        except ImportError:
+            continue
+        codecs.append(name)
+    return tuple(codecs)
+
+
+def default_codec():
+    return available_codecs()[0]
+
+
+def delta_encode(values: np.ndarray) -> np.ndarray:
+    """ delta of delta encoding, the first value and the first delta are kept as is
+    """
+    values = np.asarray(values, dtype=np.int64)
+    encoded = np.diff(values, n=1, prepend=0)
+    encoded[2:] = np.diff(encoded[1:])
+    return encoded
+
+
+def delta_decode(encoded: np.ndarray) -> np.ndarray:
+    deltas = encoded.copy()
+    deltas[1:] = np.cumsum(encoded[1:])
+    return np.cumsum(deltas)
+
+
+def shuffle(values: np.ndarray) -> bytes:
+    """ byte-shuffle a 1-d array of 8 bytes values
+    """
+    return np.ascontiguousarray(values, dtype=np.float64).view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def unshuffle(buffer, n) -> np.ndarray:
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(8, n).T.copy().view(np.float64).ravel()
+
+
+def encode(df: pd.DataFrame, codec: str = None, time_column='open_time') -> bytes:
+    """ encode a data frame with an int64 time column and float columns into one block
+    """
+    codec = default_codec() if codec is None else codec
+    compress = _CODECS[codec]()[0]
+    columns = [c for c in df.columns if c != time_column]
+    n = df.shape[0]
+    payload = [delta_encode(df[time_column].to_numpy()).tobytes()]
+    payload.extend(shuffle(df[c].to_numpy(dtype=np.float64)) for c in columns)
+    payload = compress(b''.join(payload))
+    header = json.dumps({'n': n, 'codec': codec, 'time': time_column, 'columns': columns}).encode()
+    return _PREFIX.pack(MAGIC, len(header), len(payload)) + header + payload
+
+
+def decode(buffer, n_bytes=None) -> pd.DataFrame:
+    """ decode the blocks of a ccb file, ignoring the bytes after `n_bytes`
+    """
+    buffer = memoryview(buffer)
+    n_bytes = len(buffer) if n_bytes is None else min(n_bytes, len(buffer))
+    frames = []
+    offset = 0
+    while offset + _PREFIX.size <= n_bytes:
+        magic, header_length, payload_length = _PREFIX.unpack_from(buffer, offset)
+        if magic != MAGIC:
+            raise ValueError(f'Not a ccb block at offset {offset}')
+        start = offset + _PREFIX.size
+        end = start + header_length + payload_length
+        if end > n_bytes:
+            # unfinished append
+            break
+        header = json.loads(bytes(buffer[start:start + header_length]))
+        payload = _CODECS[header['codec']]()[1](buffer[start + header_length:end])
+        n = header['n']
+        data = {header['time']: delta_decode(np.frombuffer(payload, dtype=np.int64, count=n))}
+        for i, column in enumerate(header['columns']):
+            data[column] = unshuffle(payload[8 * n * (i + 1):8 * n * (i + 2)], n)
+        frames.append(pd.DataFrame(data))
+        offset = end
+    if len(frames) == 0:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_blocks(f, n_bytes=None):
+    """ (offset, end, number of rows) of the complete blocks of an open ccb file, only the headers are read
+    """
+    size = f.seek(0, os.SEEK_END)
+    n_bytes = size if n_bytes is None else min(n_bytes, size)
+    offset = 0
+    while offset + _PREFIX.size <= n_bytes:
+        f.seek(offset)
+        magic, header_length, payload_length = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f'Not a ccb block at offset {offset}')
+        end = offset + _PREFIX.size + header_length + payload_length
+        if end > n_bytes:
+            break
+        yield offset, end, json.loads(f.read(header_length))['n']
+        offset = end
+
+
+def read(path, n_bytes=None) -> pd.DataFrame:
+    with open(path, 'rb') as f:
+        return decode(f.read(n_bytes) if n_bytes is not None else f.read())
@@ -1,10 +1,14 @@
 import pandas as pd
+import queue
+import threading
 from ccbacktest.utils.pandas_utils import concat_dataframes, concat_series
 
+
 def _time_frame_to_ms(t):
     tf = pd.to_timedelta(t)
     return tf.value // 1000_000
 
+
 class DataLoader(object):
     def __init__(self, backend, timeframe='1h', start=None, train_end=None,
                  test_end=None, pipeline=None, format=None, window=30, symbol=None, join_ohlcv=True):
@@ -70,15 +74,20 @@ class DataLoader(object):
         if self._history_data is None:
             raise NotTrainedYetError("Train data should be generated first to make a history data")
         data = self.backend.download(self._symbol, self._timeframe, self.train_end, self.test_end)
+        yield from self._step_data(data)
+
+    def _step_data(self, data: pd.DataFrame):
+        """ step the pipeline over every row of the downloaded data, yielding the updated history each time
+        """
         for i in range(data.shape[0]):
             series = self.step(data.iloc[i, :])
-            if self._join_ohlcv:
+            if self._join_ohlcv and self.pipeline is not None:
                 series = concat_series([data.iloc[i, :], series])
             self._update_history(series)
             yield self._history_data.copy()
 
     def _update_history(self, series: pd.Series):
-        data = self._history_data.append(series)[1:]
+        data = pd.concat([self._history_data, series.to_frame().T])[1:]
         self._history_data = data
 
     def _parse_time(self, t):
@@ -95,5 +104,121 @@ class DataLoader(object):
         return series
 
 
+class PrefetchDataLoader(DataLoader):
+    """
+    A data loader that downloads the test period from a background thread, as soon as the train data has been
+    downloaded, so that the network / disk I/O overlaps with the pipeline being applied on the train data. The
+    test period is downloaded (and read from the cache) in one call, then handed to the stepping loop in chunks of
+    `chunk_size` bars through a queue of at most `lookahead` chunks.
+    """
+
+    def __init__(self, backend, timeframe='1h', start=None, train_end=None,
+                 test_end=None, pipeline=None, format=None, window=30, symbol=None, join_ohlcv=True,
+                 chunk_size=500, lookahead=2):
+        super(PrefetchDataLoader, self).__init__(backend, timeframe=timeframe, start=start, train_end=train_end,
+                                                 test_end=test_end, pipeline=pipeline, format=format,
+                                                 window=window, symbol=symbol, join_ohlcv=join_ohlcv)
+        assert chunk_size > 0, "chunk_size should be a positive number of bars"
+        assert lookahead > 0, "lookahead should be a positive number of chunks"
+        self._chunk_size = chunk_size
+        self._lookahead = lookahead
+        self._queue = None
+        self._stop = None
+        self._thread = None
+
+    @DataLoader.train_end.setter
+    def train_end(self, train_end):
+        # the chunks being prefetched are those of the previous test period
+        self.stop_prefetch()
+        DataLoader.train_end.fset(self, train_end)
+
+    @DataLoader.test_end.setter
+    def test_end(self, test_end):
+        self.stop_prefetch()
+        DataLoader.test_end.fset(self, test_end)
+
+    def train_data(self):
+        data = self.backend.download(self._symbol, self._timeframe, self._start, self.train_end)
+        # the test chunks are fetched while the pipeline is being applied on the train data, a thread left by a
+        # previous (walk-forward) period is replaced
+        self.stop_prefetch()
+        self.start_prefetch()
+        if self.pipeline is not None:
+            data_apply = self.pipeline.apply(data)
+            if self._join_ohlcv:
+                data = concat_dataframes([data, data_apply])
+            else:
+                data = data_apply
+        self._history_data = data.iloc[-self._window:, :].copy()
+        return data
+
+    def test_data(self):
+        if self._history_data is None:
+            raise NotTrainedYetError("Train data should be generated first to make a history data")
+        if self._thread is None:
+            self.start_prefetch()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END_OF_DATA:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield from self._step_data(item)
+        finally:
+            self.stop_prefetch()
+
+    def start_prefetch(self):
+        """ start the background thread downloading the current test period, does nothing if it's already running
+        """
+        if self._thread is not None:
+            return
+        self._queue = queue.Queue(maxsize=self._lookahead)
+        self._stop = threading.Event()
+        # the bounds are read here, the thread never looks at the (mutable) attributes of the loader
+        bounds = (self._parse_time(self.train_end), self._parse_time(self.test_end))
+        self._thread = threading.Thread(target=self._prefetch, args=(self._queue, self._stop, *bounds), daemon=True)
+        self._thread.start()
+
+    def stop_prefetch(self):
+        """ stop the background thread, chunks that are already in the queue are discarded
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        # unblock the producer if it's waiting on a full queue
+        while not self._queue.empty():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        self._thread = None
+
+    def _put(self, q, stop, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _prefetch(self, q, stop, test_start, test_end):
+        try:
+            # a single download, every backend.download call reads the whole cache file
+            data = self.backend.download(self._symbol, self._timeframe, test_start, test_end)
+            for i in range(0, data.shape[0], self._chunk_size):
+                if not self._put(q, stop, data.iloc[i:i + self._chunk_size]):
+                    return
+        except Exception as e:
+            self._put(q, stop, e)
+            return
+        self._put(q, stop, _END_OF_DATA)
+
+
+_END_OF_DATA = object()
+
+
 class NotTrainedYetError(Exception):
     pass
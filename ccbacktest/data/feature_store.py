@@ -0,0 +1,336 @@
+import numpy as np
+import pandas as pd
+import threading
+from collections import OrderedDict, namedtuple
+from multiprocessing import shared_memory, resource_tracker
+from multiprocessing.managers import BaseManager
+
+# description of a frame living in a shared memory block, it's what is sent between the store and the workers,
+# the block holds the index (n int64) followed by the values (n x m float64, C ordered)
+SharedFrameInfo = namedtuple('SharedFrameInfo', ['key', 'shm_name', 'shape', 'columns', 'index_dtype', 'index_name'])
+
+
+def feature_key(symbol, timeframe, factor_set, start, end):
+    """ build the key under which a computed frame is shared
+    :arg factor_set: name identifying the factors applied (the pipeline name for example), None for raw candles
+    """
+    return symbol, timeframe, factor_set, str(pd.Timestamp(start)), str(pd.Timestamp(end))
+
+
+def _block_size(shape):
+    n, m = shape
+    return max(8 * n * (m + 1), 1)
+
+
+_attach_lock = threading.Lock()
+
+
+def _attach_block(name):
+    """ attach to an existing block without letting this process' resource tracker unlink it on exit,
+    the store is the only owner of the blocks
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 registers attached blocks to the resource tracker as if they were created here
+        with _attach_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+def _close_block(shm):
+    """ close a block attached in this process, frames (or arrays) taken from it before `close` may still be in
+    use: their views keep the mapping alive, it's unmapped when the last of them is garbage collected
+    """
+    try:
+        shm.close()
+    except BufferError:
+        # the views hold the buffer, which holds the mmap, only the file descriptor is closed here
+        shm._buf = None
+        shm._mmap = None
+        shm.close()
+
+
+class _Entry(object):
+    __slots__ = ['shm', 'info', 'refcount', 'committed']
+
+    def __init__(self, shm, info):
+        self.shm = shm
+        self.info = info
+        self.refcount = 1
+        self.committed = False
+
+
+class FeatureStore(object):
+    """
+    Owns candles and factor values in shared memory blocks, keyed by (symbol, timeframe, factor set, range).
+    Workers acquire a key to get a description of the block, and map it as a read-only frame with `attach`.
+    Blocks are reference counted, and the least recently used blocks that are no longer referenced are
+    evicted when the total size exceeds `memory_limit` bytes.
+    """
+
+    def __init__(self, memory_limit=1 << 30):
+        self.memory_limit = memory_limit
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def keys(self):
+        with self._lock:
+            return [key for key, entry in self._entries.items() if entry.committed]
+
+    def acquire(self, key):
+        """ take a reference on a shared frame
+        :return: the frame's SharedFrameInfo, or None if it's not in the store (or still being written)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.committed:
+                return None
+            entry.refcount += 1
+            self._entries.move_to_end(key)
+            return entry.info
+
+    def release(self, key):
+        """ drop a reference taken by `acquire` or `allocate`
+        """
+        with self._lock:
+            entry = self._entries[key]
+            assert entry.refcount > 0, f"Reference count of {key} is already zero"
+            entry.refcount -= 1
+            if not entry.committed and entry.refcount == 0:
+                # the writer gave up before committing
+                self._remove(key)
+            self._evict()
+
+    def allocate(self, key, shape, columns, index_dtype='datetime64[ns]', index_name=None):
+        """ create the block for a new frame, the caller holds a reference on it and should fill it then `commit`
+        :return: the frame's SharedFrameInfo, or None if the key is already in the store
+        """
+        index_dtype = np.dtype(index_dtype)
+        assert index_dtype.itemsize == 8, "Only 8 bytes index types are supported"
+        with self._lock:
+            if key in self._entries:
+                return None
+            size = _block_size(shape)
+            self._evict(size)
+            if self._nbytes + size > self.memory_limit:
+                raise FeatureStoreFullError(f'Cannot allocate {size} bytes for {key}, {self._nbytes} bytes are '
+                                            f'in use out of {self.memory_limit}')
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            info = SharedFrameInfo(key, shm.name, tuple(shape), list(columns), index_dtype.str, index_name)
+            self._entries[key] = _Entry(shm, info)
+            self._nbytes += size
+            return info
+
+    def commit(self, key):
+        """ make a frame written after `allocate` visible to the other workers
+        """
+        with self._lock:
+            self._entries[key].committed = True
+
+    def put(self, key, df: pd.DataFrame):
+        """ copy a frame into the store, mostly useful from the store's own process
+        :return: the frame's SharedFrameInfo with a reference held by the caller, or None if the key exists
+        """
+        info = self.allocate(key, df.shape, df.columns, df.index.dtype, df.index.name)
+        if info is None:
+            return None
+        frame = attach(info, writeable=True)
+        try:
+            frame.write(df)
+        finally:
+            frame.close()
+        self.commit(key)
+        return info
+
+    def clear(self):
+        """ unlink every block, whether it's referenced or not
+        """
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _evict(self, extra=0):
+        for key in list(self._entries):
+            if self._nbytes + extra <= self.memory_limit:
+                return
+            if self._entries[key].refcount == 0:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._nbytes -= entry.shm.size
+        entry.shm.close()
+        entry.shm.unlink()
+
+
+class SharedFrame(object):
+    """
+    A frame mapped from a store's shared memory block, the `frame` attribute is only valid until `close` is called
+    """
+
+    def __init__(self, info: SharedFrameInfo, writeable=False):
+        self.info = info
+        self._shm = _attach_block(info.shm_name)
+        n, m = info.shape
+        # np.frombuffer holds an export on the block's buffer, every view taken from the frame does through it, so
+        # the mapping can't be closed under a view (see _close_block)
+        raw = np.frombuffer(self._shm.buf, dtype=np.uint8)
+        self._index = raw[:8 * n].view(info.index_dtype)
+        self._values = raw[8 * n:8 * n * (m + 1)].view(np.float64).reshape(n, m)
+        self._index.flags.writeable = writeable
+        self._values.flags.writeable = writeable
+        self._frame = None
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            columns = self.info.columns
+            if len(columns) > 0 and isinstance(columns[0], tuple):
+                columns = pd.MultiIndex.from_tuples(columns)
+            index = pd.Index(self._index, name=self.info.index_name, copy=False)
+            self._frame = pd.DataFrame(self._values, index=index, columns=columns, copy=False)
+        return self._frame
+
+    def write(self, df: pd.DataFrame):
+        self._index[:] = df.index.values.view(self._index.dtype)
+        self._values[:] = df.to_numpy(dtype=np.float64)
+
+    def close(self):
+        self._frame = None
+        self._index = None
+        self._values = None
+        _close_block(self._shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach(info: SharedFrameInfo, writeable=False) -> SharedFrame:
+    """ map a shared frame in the current process, read-only unless `writeable` is set
+    """
+    return SharedFrame(info, writeable=writeable)
+
+
+class FeatureStoreClient(object):
+    """
+    Worker side helper, the store is either a FeatureStore or a proxy to one served by a FeatureStoreManager
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def get(self, key, compute):
+        """ get a shared frame, computing it with `compute()` and sharing it if no worker did it before
+        :return: a frame holder to close once the frame is not used anymore, it's backed by the store's shared
+        memory, or by the computed frame itself when another worker is writing the same key at the same time or
+        when the store is full
+        """
+        info = self.store.acquire(key)
+        if info is not None:
+            return _ReleasingFrame(self.store, info)
+        df = compute()
+        try:
+            info = self.store.allocate(key, df.shape, list(df.columns), df.index.dtype.str, df.index.name)
+        except FeatureStoreFullError:
+            return LocalFrame(df)
+        if info is None:
+            info = self.store.acquire(key)
+            return LocalFrame(df) if info is None else _ReleasingFrame(self.store, info)
+        try:
+            with attach(info, writeable=True) as frame:
+                frame.write(df)
+        except BaseException:
+            self.store.release(key)
+            raise
+        self.store.commit(key)
+        return _ReleasingFrame(self.store, info)
+
+    def download(self, backend, symbol, timeframe, start, end, pipeline=None):
+        """ shared version of `backend.download` followed by `pipeline.apply`
+        """
+        name = None if pipeline is None else pipeline.name
+
+        def compute():
+            data = backend.download(symbol, timeframe, start, end)
+            return data if pipeline is None else pipeline.apply(data)
+
+        return self.get(feature_key(symbol, timeframe, name, start, end), compute)
+
+
+class LocalFrame(object):
+    """ a frame held by the worker itself, with the same interface as a SharedFrame
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._frame = df
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._frame
+
+    def close(self):
+        self._frame = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ReleasingFrame(SharedFrame):
+    """ a read-only shared frame that releases its reference on the store when closed
+    """
+
+    def __init__(self, store, info):
+        super(_ReleasingFrame, self).__init__(info)
+        self._store = store
+
+    def close(self):
+        if self._store is None:
+            return
+        super(_ReleasingFrame, self).close()
+        self._store.release(self.info.key)
+        self._store = None
+
+
+class FeatureStoreManager(BaseManager):
+    """
+    Serves a single FeatureStore to worker processes:
+
+        manager = FeatureStoreManager(address=('127.0.0.1', 50000), authkey=b'key')
+        manager.start()  # or manager.get_server().serve_forever() in a dedicated process
+        client = FeatureStoreClient(manager.FeatureStore())
+    """
+    pass
+
+
+_store = None
+
+
+def _get_store(memory_limit=1 << 30):
+    global _store
+    if _store is None:
+        _store = FeatureStore(memory_limit)
+    return _store
+
+
+FeatureStoreManager.register('FeatureStore', callable=_get_store,
+                             exposed=['acquire', 'release', 'allocate', 'commit', 'keys', 'clear'])
+
+
+class FeatureStoreFullError(Exception):
+    pass
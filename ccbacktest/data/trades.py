@@ -0,0 +1,121 @@
+import os
+import numpy as np
+import pandas as pd
+from ccbacktest.data import caching
+from ccbacktest.data.caching import read_status, write_status
+
+# one trade is a fixed size binary record (33 bytes), the store is a plain concatenation of records sorted by time
+TRADE_DTYPE = np.dtype([('id', '<i8'), ('time', '<i8'), ('price', '<f8'), ('amount', '<f8'),
+                        ('is_buyer_maker', '?')])
+
+
+def trades_paths(backend: str, ticker: str):
+    """ path of the binary trades file and of its json status file
+    :return: (data path, status path)
+    """
+    base, symbol = ticker.split('/')
+    directory = os.path.join(caching.CACHE_DIRECTORY, backend, base)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{symbol}-trades.bin'), os.path.join(directory, f'{symbol}-trades.json')
+
+
+def trades_from_ccxt(trades: list) -> np.ndarray:
+    """ convert the trades returned by a ccxt exchange's `fetch_trades` to trade records, the store orders the trades
+    by id so the ids have to be increasing integers (or strings of them, like binance's)
+    """
+    records = np.empty(len(trades), dtype=TRADE_DTYPE)
+    records['id'] = [int(t['id']) for t in trades]
+    records['time'] = [t['timestamp'] for t in trades]
+    records['price'] = [t['price'] for t in trades]
+    records['amount'] = [t['amount'] for t in trades]
+    # the taker sold, so the buyer was the maker
+    records['is_buyer_maker'] = [t['side'] == 'sell' for t in trades]
+    return records
+
+
+class TradeStore(object):
+    """
+    Trades of a ticker cached as fixed size binary records, appended in time order and read back through a memory
+    map, so that a reader never holds more than one chunk of trades in memory
+    """
+
+    def __init__(self, backend: str, ticker: str):
+        self.backend = backend
+        self.ticker = ticker
+        self.path, self._json_path = trades_paths(backend, ticker)
+
+    @property
+    def status(self) -> dict:
+        status = read_status(self._json_path)
+        if status is None:
+            status = {'n_trades': 0, 'last_id': None, 'last_time': None}
+        return status
+
+    def __len__(self):
+        return self.status['n_trades']
+
+    def append(self, trades: np.ndarray):
+        """ append trades more recent than the stored ones, trades already stored (by id) are dropped
+        :return: number of appended trades
+        """
+        status = self.status
+        trades = np.sort(trades.astype(TRADE_DTYPE, copy=False), order=['time', 'id'])
+        if status['last_id'] is not None:
+            trades = trades[trades['id'] > status['last_id']]
+        if trades.shape[0] == 0:
+            return 0
+        if status['last_time'] is not None and trades['time'][0] < status['last_time']:
+            raise ValueError('Trades can only be appended in time order')
+        n_bytes = status['n_trades'] * TRADE_DTYPE.itemsize
+        mode = 'r+b' if os.path.exists(self.path) else 'wb'
+        with open(self.path, mode) as f:
+            # drop the bytes of an append that was interrupted before its status was written
+            f.truncate(n_bytes)
+            f.seek(n_bytes)
+            f.write(trades.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        status = {'n_trades': status['n_trades'] + trades.shape[0], 'last_id': int(trades['id'][-1]),
+                  'last_time': int(trades['time'][-1])}
+        write_status(self._json_path, status)
+        return trades.shape[0]
+
+    def read(self) -> np.ndarray:
+        """ memory map of all the stored trades
+        """
+        n_trades = len(self)
+        if n_trades == 0:
+            return np.empty(0, dtype=TRADE_DTYPE)
+        return np.memmap(self.path, dtype=TRADE_DTYPE, mode='r', shape=(n_trades,))
+
+    def iter_chunks(self, start=None, end=None, chunk_size=1 << 20):
+        """ stream the trades between start and end (inclusive, ms timestamps or anything pd.Timestamp parses)
+        in chunks of `chunk_size` trades, the chunks are read-only views on the memory map
+        """
+        trades = self.read()
+        if trades.shape[0] == 0:
+            return
+        first = 0 if start is None else _search(trades, _to_ms(start), right=False)
+        last = trades.shape[0] if end is None else _search(trades, _to_ms(end), right=True)
+        for i in range(first, last, chunk_size):
+            yield trades[i:min(i + chunk_size, last)]
+
+
+def _search(trades, t, right):
+    """ binary search on the time of the records, np.searchsorted would copy the whole (strided) time column
+    """
+    lo, hi = 0, trades.shape[0]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        value = trades[mid]['time']
+        if value < t or (right and value == t):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _to_ms(t):
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    return pd.Timestamp(t).value // 1000_000
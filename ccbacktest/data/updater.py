@@ -0,0 +1,149 @@
+import heapq
+import time
+import pandas as pd
+from ccbacktest.data.caching import (cache_paths, cache_lock, read_status, write_status, append_data, stored_format,
+                                     validate_ohlcv, _ingest)
+from ccbacktest.data.data_loader import _time_frame_to_ms
+from ccbacktest.utils.rate_limit import RateLimiter
+
+_data_names = ['open_time', 'open', 'high', 'low', 'close', 'volume']
+
+
+class CacheUpdater(object):
+    """
+    Keep the local cache of a universe of (ticker, timeframe) pairs current, by fetching only the closed candles
+    after the last cached `open_time` and appending them to the cache. The pairs are refreshed by order of
+    staleness, with the requests spaced out by the exchange's rate limit.
+
+        updater = CacheUpdater(ccxt.binance(), [('BTC/USDT', '1m'), ('ETH/USDT', '1h')])
+        updater.run()
+    """
+
+    def __init__(self, exchange, universe, backend='binance', start=None, limit=1000, rate_limit=None,
+                 retry_delay=1000, clock=time.time, sleep=time.sleep):
+        """
+        :arg exchange: ccxt exchange (or any object with the same `fetch_ohlcv` method)
+        :arg universe: list of (ticker, timeframe) pairs
+        :arg backend: name of the backend in the cache, the same as used by `cache_download`
+        :arg start: where to start pairs that are not cached yet, in ms, defaults to `limit` candles before now
+        :arg limit: number of candles per request
+        :arg rate_limit: minimum number of milliseconds between two requests, defaults to exchange.rateLimit
+        :arg retry_delay: milliseconds to wait before polling again a pair for which the exchange had no new candle
+        """
+        self.exchange = exchange
+        self.backend = backend
+        self._start = start
+        self._limit = limit
+        self._retry_delay = retry_delay
+        if rate_limit is None:
+            rate_limit = getattr(exchange, 'rateLimit', 0)
+        self._rate_limiter = RateLimiter(rate_limit, clock=clock, sleep=sleep)
+        self._clock = clock
+        self._sleep = sleep
+        self._heap = []
+        for ticker, timeframe in universe:
+            heapq.heappush(self._heap, (self.next_due(ticker, timeframe), ticker, timeframe))
+
+    def _now(self):
+        return int(self._clock() * 1000)
+
+    def last_open_time(self, ticker, timeframe):
+        """ open time of the last cached candle, None if the pair is not cached
+        """
+        path, json_path = cache_paths(self.backend, ticker, timeframe)
+        status = read_status(json_path)
+        if status is None or len(status['already_downloaded']) == 0:
+            return None
+        return status['already_downloaded'][-1]
+
+    def next_due(self, ticker, timeframe):
+        """ time in ms at which a new candle will be closed for the pair
+        """
+        last = self.last_open_time(ticker, timeframe)
+        if last is None:
+            return 0
+        return last + 2 * _time_frame_to_ms(timeframe)
+
+    def update(self, ticker, timeframe):
+        """ fetch and append the closed candles after the last cached one
+        :return: number of appended candles
+        """
+        step = _time_frame_to_ms(timeframe)
+        path, json_path = cache_paths(self.backend, ticker, timeframe)
+        last = self.last_open_time(ticker, timeframe)
+        if last is None:
+            since = self._start if self._start is not None else self._now() - self._limit * step
+        else:
+            since = last + 1
+        total = 0
+        while True:
+            self._rate_limiter.wait()
+            page = self.exchange.fetch_ohlcv(ticker, timeframe=timeframe, since=since, limit=self._limit)
+            df = pd.DataFrame(page, columns=_data_names)
+            n_fetched = df.shape[0]
+            # the last candle is still open
+            df = df[(df.open_time >= since) & (df.open_time + step <= self._now())]
+            with cache_lock(json_path):
+                # a backtest may have rewritten the cache during the request, the append is based on the current
+                # status, not on the one read before fetching
+                status = read_status(json_path)
+                # the page is validated like a download (see cache_download), the invalid rows are counted in the
+                # new status
+                new_status = dict(status) if status is not None else {}
+                df = _ingest(df, step, new_status)
+                covered = new_status.get('already_downloaded', [])
+                if len(covered) > 0:
+                    df = df[df.open_time > covered[-1]]
+                if df.shape[0] == 0:
+                    break
+                first, last = int(df.open_time.iat[0]), int(df.open_time.iat[-1])
+                report = validate_ohlcv(df.open_time.values, step, df.volume.values, coverage=[first, last])
+                n_bytes = append_data(path, df, status)
+                zero_volume = new_status.get('zero_volume', [])
+                if len(covered) > 0 and covered[-1] >= first - step:
+                    # the appended candles extend the last covered interval
+                    if (len(zero_volume) > 0 and len(report['zero_volume']) > 0 and zero_volume[-1][1] == covered[-1]
+                            and report['zero_volume'][0][0] == first):
+                        # a run of candles without volume continues across the append
+                        zero_volume = zero_volume[:-1] + [[zero_volume[-1][0], report['zero_volume'].pop(0)[1]]]
+                    covered = covered[:-1] + [last]
+                else:
+                    covered = covered + [first, last]
+                new_status.update({'already_downloaded': covered, 'gaps': new_status.get('gaps', []) + report['gaps'],
+                                   'zero_volume': zero_volume + report['zero_volume'], 'n_bytes': n_bytes,
+                                   'format': stored_format(path, status)})
+                write_status(json_path, new_status)
+            total += df.shape[0]
+            since = last + 1
+            if n_fetched < self._limit:
+                break
+        return total
+
+    def run_once(self):
+        """ update every pair for which a new candle has closed, the stalest first
+        :return: number of appended candles per updated pair
+        """
+        updated = {}
+        now = self._now()
+        while len(self._heap) > 0 and self._heap[0][0] <= now:
+            _, ticker, timeframe = heapq.heappop(self._heap)
+            updated[(ticker, timeframe)] = self.update(ticker, timeframe)
+            due = self.next_due(ticker, timeframe)
+            if due <= now:
+                due = now + self._retry_delay
+            heapq.heappush(self._heap, (due, ticker, timeframe))
+        return updated
+
+    def run(self, stop=None, max_cycles=None):
+        """ keep the cache current until `stop` (a threading.Event) is set
+        """
+        cycles = 0
+        while (stop is None or not stop.is_set()) and (max_cycles is None or cycles < max_cycles):
+            self.run_once()
+            cycles += 1
+            wait = (self._heap[0][0] - self._now()) / 1000
+            if wait > 0:
+                if stop is not None:
+                    stop.wait(wait)
+                else:
+                    self._sleep(wait)
@@ -0,0 +1,148 @@
+from abc import ABC
+import numpy as np
+import pandas as pd
+from .factors import Factor, TooSmallHistoryError
+
+
+def rolling_sums(values: np.ndarray, windows) -> np.ndarray:
+    """ rolling sums of a series for several window sizes at once, from a single cumulative sum
+    :arg values: 1-d array, NaN values are skipped but a window containing one is NaN (like pandas' rolling)
+    :arg windows: the window sizes
+    :return: 2-d array (time x window), NaN until a window is full
+    """
+    return _rolling(np.asarray(values, dtype=np.float64), windows, mean=False)
+
+
+def rolling_means(values: np.ndarray, windows) -> np.ndarray:
+    """ rolling means for several window sizes at once, see rolling_sums
+    """
+    return _rolling(np.asarray(values, dtype=np.float64), windows, mean=True)
+
+
+def _rolling(values: np.ndarray, windows, mean: bool) -> np.ndarray:
+    n = values.shape[0]
+    missing = np.isnan(values)
+    reference = 0.
+    if mean and not missing.all():
+        # the series is centered on its first value, so the cumulative sum stays small and keeps its precision
+        reference = values[np.argmin(missing)]
+    sums = np.concatenate([[0.], np.cumsum(np.where(missing, 0., values - reference))])
+    has_missing = missing.any()
+    if has_missing:
+        counts = np.concatenate([[0], np.cumsum(missing)])
+    # column major, so that each window is written as one contiguous difference of the cumulative sum, the means
+    # are then computed in place without time x window temporaries
+    result = np.empty((n, len(windows)), order='F')
+    for j, w in enumerate(windows):
+        result[:w - 1, j] = np.nan
+        if w > n:
+            continue
+        column = result[w - 1:, j]
+        np.subtract(sums[w:], sums[:n - w + 1], out=column)
+        if mean:
+            column /= w
+            column += reference
+        if has_missing:
+            column[counts[w:] != counts[:n - w + 1]] = np.nan
+    return result
+
+
+class FactorFamily(Factor, ABC):
+    """
+    Base class for the factors computing every parameter variant of a factor in one pass, `func` returns a data
+    frame with one column per variant, so that a family can be used wherever a factor is (in a
+    MultiFactorPipeline for example), the variants share one cumulative sum instead of a rolling window each
+    """
+
+    def __init__(self, periods, name):
+        super(Factor, self).__init__()
+        assert len(periods) > 0, 'A family needs at least one variant'
+        assert all(isinstance(p, (int, np.integer)) and p > 0 for p in periods), \
+            'Periods should be positive integers'
+        self.variants = sorted(set(int(p) for p in periods))
+        # the history needed by the longest variant
+        self.periods = self.variants[-1]
+        self.name = name
+        self._history = None
+
+    def _frame(self, values: np.ndarray, df: pd.DataFrame, prefix: str) -> pd.DataFrame:
+        return pd.DataFrame(values, index=df.index, columns=[f'{prefix}_{p}' for p in self.variants])
+
+    def step(self, series: pd.Series) -> pd.Series:
+        data = pd.concat([self.history['data_history'], series.to_frame().T])
+        value = self.func(data).iloc[-1].rename(series.name)
+        self.history['data_history'] = data.iloc[1:]
+        self.history['factor_history'] = pd.concat([self.history['factor_history'], value.to_frame().T]).iloc[1:]
+        return value
+
+
+class MovingAverageFamily(FactorFamily):
+    """ moving averages (MA) for several periods, all computed from one cumulative sum
+    """
+
+    def __init__(self, periods, on='close'):
+        assert (on in ['close', 'open']), 'Only open and close are supported'
+        super().__init__(periods, name='MA')
+        self._on = on
+
+    def func(self, df):
+        return self._frame(rolling_means(df[self._on].to_numpy(dtype=np.float64), self.variants), df, 'MA')
+
+
+class RSIFamily(FactorFamily):
+    """ relative strength indices (RSI) for several periods
+    """
+
+    def __init__(self, periods):
+        super().__init__(periods, name='RSI')
+
+    def func(self, df):
+        if df.shape[0] <= self.periods:
+            raise TooSmallHistoryError('History data frame is too small to compute the moving average with '
+                                       f'{self.periods} periods, on {df.shape[0]} time steps')
+        diff = df['close'].to_numpy(dtype=np.float64) - df['open'].to_numpy(dtype=np.float64)
+        pos = diff >= 0
+        pos_mean = rolling_means(np.where(pos, diff, 0.), self.variants)
+        neg_mean = -rolling_means(np.where(~pos, diff, 0.), self.variants)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = 100 - 100 / np.abs(1 + pos_mean / neg_mean)
+        return self._frame(factor, df, 'RSI')
+
+
+class VWAPFamily(FactorFamily):
+    """ volume weighted average prices (VWAP) for several periods
+    """
+
+    def __init__(self, periods):
+        super().__init__(periods, name='VWAP')
+
+    def func(self, df):
+        volume = df['volume'].to_numpy(dtype=np.float64)
+        product = df['open'].to_numpy(dtype=np.float64) * volume
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = rolling_sums(product, self.variants) / rolling_sums(volume, self.variants)
+        return self._frame(vwap, df, 'VWAP')
+
+
+class MACDFamily(FactorFamily):
+    """ MACD for several (fast, slow) pairs, the moving average of each distinct period is computed once and shared
+    by all the pairs using it. The columns are the same as MovingAverageConvergenceDivergence's:
+    (MACD_fast_slow, fast) and (MACD_fast_slow, slow)
+    """
+
+    def __init__(self, pairs, on='close'):
+        assert all(fast < slow for fast, slow in pairs), 'The fast period should be shorter than the slow one'
+        self.pairs = [(int(fast), int(slow)) for fast, slow in pairs]
+        super().__init__([p for pair in self.pairs for p in pair], name='MACD')
+        self._on = on
+
+    def func(self, df):
+        means = rolling_means(df[self._on].to_numpy(dtype=np.float64), self.variants)
+        column = {p: i for i, p in enumerate(self.variants)}
+        indices = [column[p] for pair in self.pairs for p in pair]
+        columns = pd.MultiIndex.from_tuples([(f'MACD_{fast}_{slow}', kind) for fast, slow in self.pairs
+                                             for kind in ['fast', 'slow']])
+        return pd.DataFrame(means[:, indices], index=df.index, columns=columns)
+
+
+MAFamily = MovingAverageFamily
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from ccbacktest.data.trades import _to_ms
+
+BUY = 1
+SELL = -1
+
+
+class _Order(object):
+    __slots__ = ['id', 'time', 'side', 'price', 'remaining', 'queue_ahead']
+
+    def __init__(self, id, time, side, price, amount, queue_ahead):
+        self.id = id
+        self.time = time
+        self.side = side
+        self.price = price
+        self.remaining = amount
+        self.queue_ahead = queue_ahead
+
+
+class FillSimulator(object):
+    """
+    Simulate the fills of orders against a stream of trades (chunks of TRADE_DTYPE records, see
+    ccbacktest.data.trades), with a queue position approximation for limit orders:
+
+    - a buy (sell) limit order rests at its price behind `queue_ahead` units submitted before it,
+    - trades at the order's price where the buyer (seller) is the maker first consume the queue ahead, then fill
+      the order,
+    - a trade through the order's price (lower for a buy, higher for a sell) means the price level was cleared,
+      the queue ahead is gone and the whole traded amount is available to the order,
+    - a market order fills against the next trades at their prices,
+    - the orders are matched in submission order and share the volume of each trade, so an order queues behind our
+      own earlier orders at the same price and the same traded amount is never filled twice.
+
+    Each chunk is matched with array operations over the trades, the python work only grows with the number of
+    open orders.
+    """
+
+    def __init__(self):
+        self._orders = {}
+        self._next_id = 0
+        self._fills = {'order_id': [], 'time': [], 'price': [], 'amount': [], 'side': []}
+
+    def submit(self, t, side, amount, price=None, queue_ahead=0.):
+        """ submit an order, it can only be filled by trades that happen at or after t
+        :arg side: BUY (1) or SELL (-1)
+        :arg price: limit price, None for a market order
+        :arg queue_ahead: amount resting at the same price before the order, for example the size of the price
+        level in the order book when the order is submitted
+        :return: the order id
+        """
+        assert side in (BUY, SELL), 'side should be BUY (1) or SELL (-1)'
+        assert amount > 0, 'amount should be positive'
+        order_id = self._next_id
+        self._next_id += 1
+        self._orders[order_id] = _Order(order_id, _to_ms(t), side, price, float(amount), float(queue_ahead))
+        return order_id
+
+    def cancel(self, order_id):
+        """ cancel an order, return its unfilled amount
+        """
+        order = self._orders.pop(order_id, None)
+        return 0. if order is None else order.remaining
+
+    @property
+    def open_orders(self):
+        return {order_id: order.remaining for order_id, order in self._orders.items()}
+
+    def process(self, trades: np.ndarray):
+        """ match the open orders against a chunk of trades sorted by time
+        """
+        if trades.shape[0] == 0 or len(self._orders) == 0:
+            return
+        times = np.ascontiguousarray(trades['time'])
+        prices = np.ascontiguousarray(trades['price'])
+        # volume of each trade not taken by the orders already matched
+        left = np.array(trades['amount'], dtype=np.float64)
+        buyer_maker = np.ascontiguousarray(trades['is_buyer_maker'])
+        low, high = prices.min(), prices.max()
+        for order in list(self._orders.values()):
+            # limit orders whose price isn't reached in the chunk are skipped without looking at the trades
+            if order.price is not None and (low > order.price if order.side == BUY else high < order.price):
+                continue
+            first = np.searchsorted(times, order.time, side='left')
+            if first == times.shape[0]:
+                continue
+            if order.price is None:
+                available = left[first:]
+            else:
+                available = self._limit_available(order, prices[first:], left[first:], buyer_maker[first:])
+            filled = np.minimum(np.cumsum(available), order.remaining)
+            # amount filled by each trade
+            fills = np.diff(filled, prepend=0.)
+            left[first:] -= fills
+            where = np.flatnonzero(fills > 0)
+            if where.shape[0] == 0:
+                continue
+            self._fills['order_id'].append(np.full(where.shape[0], order.id))
+            self._fills['time'].append(times[first:][where])
+            self._fills['price'].append(prices[first:][where] if order.price is None
+                                        else np.full(where.shape[0], order.price))
+            self._fills['amount'].append(fills[where])
+            self._fills['side'].append(np.full(where.shape[0], order.side, dtype=np.int8))
+            order.remaining -= filled[-1]
+            if order.remaining <= 1e-12:
+                del self._orders[order.id]
+
+    def _limit_available(self, order, prices, amounts, buyer_maker):
+        """ amount of each trade available to a resting limit order, updating its queue position
+        """
+        if order.side == BUY:
+            through = prices < order.price
+            at_price = (prices == order.price) & buyer_maker
+        else:
+            through = prices > order.price
+            at_price = (prices == order.price) & ~buyer_maker
+        at_volume = np.where(at_price, amounts, 0.)
+        # the queue ahead is consumed by the trades at the order's price until the level is traded through
+        cleared = np.flatnonzero(through)
+        k = cleared[0] if cleared.shape[0] > 0 else prices.shape[0]
+        queue_consumed = np.minimum(np.cumsum(at_volume[:k]), order.queue_ahead)
+        available = np.empty_like(amounts)
+        available[:k] = at_volume[:k] - np.diff(queue_consumed, prepend=0.)
+        available[k:] = np.where(through[k:], amounts[k:], at_volume[k:])
+        if k < prices.shape[0]:
+            order.queue_ahead = 0.
+        elif k > 0:
+            order.queue_ahead -= queue_consumed[-1]
+        return available
+
+    def run(self, chunks):
+        """ process an iterable of trade chunks, TradeStore.iter_chunks for example
+        :return: the fills
+        """
+        for chunk in chunks:
+            self.process(chunk)
+        return self.fills()
+
+    def fills(self) -> pd.DataFrame:
+        """ every fill so far, with its time in ms
+        """
+        if len(self._fills['order_id']) == 0:
+            return pd.DataFrame({name: [] for name in self._fills})
+        return pd.DataFrame({name: np.concatenate(values) for name, values in self._fills.items()})
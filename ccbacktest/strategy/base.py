@@ -1,16 +1,18 @@
 import abc
+from ccbacktest.strategy.recorder import ResultsRecorder
+from ccbacktest.strategy.scheduler import EventScheduler
 
 
 class Strategy(abc.ABC):
 
-  @abc.abstractmethod
   @property
-  def backend():
+  @abc.abstractmethod
+  def backend(self):
     pass
   
-  @abc.abstractmethod
   @property
-  def data_loaders():
+  @abc.abstractmethod
+  def data_loaders(self):
     pass
   
   @abc.abstractmethod
@@ -18,17 +20,37 @@ class Strategy(abc.ABC):
     pass
   
   @abc.abstractmethod
-  def schedule():
+  def schedule(self):
+    """ register the data loaders and the timers of the strategy on `self.scheduler`
+    """
     pass
 
+  @property
+  def scheduler(self) -> EventScheduler:
+    if getattr(self, '_scheduler', None) is None:
+      self._scheduler = EventScheduler()
+    return self._scheduler
+
   @abc.abstractmethod
-  def get_portfolio():
+  def get_portfolio(self):
     pass
 
   @abc.abstractmethod
-  def order():
+  def order(self):
     pass
+
+  @property
+  def recorder(self) -> ResultsRecorder:
+    if getattr(self, '_recorder', None) is None:
+      self._recorder = ResultsRecorder()
+    return self._recorder
+
+  @recorder.setter
+  def recorder(self, recorder: ResultsRecorder):
+    self._recorder = recorder
   
-  @abc.abstractmethod
-  def record():
-    pass
+  def record(self, t, equity, positions: dict = None, **metrics):
+    """ record the state of the portfolio at time t (equity, quantity held per symbol and any user metric),
+    the results are available from `self.recorder` at the end of the run
+    """
+    self.recorder.record(t, equity, positions, **metrics)
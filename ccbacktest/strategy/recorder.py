@@ -0,0 +1,259 @@
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+
+
+class ColumnBuffer(object):
+    """
+    A growable typed column, values are appended to a preallocated array that doubles its size until it holds
+    `chunk_size` values, full chunks are then spilled to `.npy` files in `spill_dir` (or kept in memory if it's None)
+    """
+
+    def __init__(self, name, dtype, chunk_size=1 << 16, spill_dir=None, capacity=1024):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self._chunk_size = chunk_size
+        self._spill_dir = spill_dir
+        self._buffer = np.empty(min(capacity, chunk_size), dtype=self.dtype)
+        self._size = 0
+        self._chunks = []
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, value):
+        if self._size == self._buffer.shape[0]:
+            self._grow()
+        self._buffer[self._size] = value
+        self._size += 1
+        self._length += 1
+
+    def fill(self, value, n):
+        """ append `n` times the same value
+        """
+        while n > 0:
+            if self._size == self._buffer.shape[0]:
+                self._grow()
+            k = min(n, self._buffer.shape[0] - self._size)
+            self._buffer[self._size:self._size + k] = value
+            self._size += k
+            self._length += k
+            n -= k
+
+    def _grow(self):
+        if self._buffer.shape[0] < self._chunk_size:
+            buffer = np.empty(min(2 * self._buffer.shape[0], self._chunk_size), dtype=self.dtype)
+            buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer
+        else:
+            self._spill()
+
+    def _spill(self):
+        chunk = self._buffer[:self._size]
+        if self._spill_dir is not None:
+            path = os.path.join(self._spill_dir, f'{self.name}-{len(self._chunks)}.npy')
+            np.save(path, chunk)
+            self._chunks.append(path)
+        else:
+            self._chunks.append(chunk.copy())
+        self._size = 0
+
+    def to_numpy(self) -> np.ndarray:
+        chunks = [np.load(c, mmap_mode='r') if isinstance(c, str) else c for c in self._chunks]
+        return np.concatenate(chunks + [self._buffer[:self._size]])
+
+
+class _Table(object):
+    """ a set of column buffers with the same length, a column created after the first row is filled with its
+    missing value for the previous rows, and so is a column left out of a row
+    """
+
+    def __init__(self, name, chunk_size, spill_dir):
+        self.name = name
+        self._chunk_size = chunk_size
+        self._spill_dir = spill_dir
+        self.columns = {}
+        self._missing = {}
+        self.n_rows = 0
+
+    def add_column(self, name, dtype, missing=np.nan):
+        column = ColumnBuffer(f'{self.name}-{len(self.columns)}', dtype, self._chunk_size, self._spill_dir)
+        column.fill(missing, self.n_rows)
+        self.columns[name] = column
+        self._missing[name] = missing
+
+    def append(self, row: dict):
+        for name, value in row.items():
+            if name not in self.columns:
+                self.add_column(name, np.float64)
+            self.columns[name].append(value)
+        self.n_rows += 1
+        for name, column in self.columns.items():
+            if len(column) < self.n_rows:
+                column.append(self._missing[name])
+
+    def to_dict(self):
+        return {name: column.to_numpy() for name, column in self.columns.items()}
+
+
+class ResultsRecorder(object):
+    """
+    Record the equity, positions, orders and user metrics of a backtest into columnar buffers, the memory used
+    stays flat over long runs as full chunks are spilled to disk, and the performance metrics are computed
+    once at the end of the run
+    """
+
+    def __init__(self, chunk_size=1 << 16, spill_dir=None, spill=True):
+        """
+        :arg chunk_size: number of rows kept in memory per column before spilling them to disk
+        :arg spill_dir: directory of the spilled chunks, a temporary directory removed by `close` by default
+        :arg spill: keep every chunk in memory if False
+        """
+        self._owns_spill_dir = spill and spill_dir is None
+        if self._owns_spill_dir:
+            spill_dir = tempfile.mkdtemp(prefix='ccbacktest-')
+            self._finalizer = weakref.finalize(self, shutil.rmtree, spill_dir, ignore_errors=True)
+        elif spill:
+            os.makedirs(spill_dir, exist_ok=True)
+        else:
+            spill_dir = None
+        self.spill_dir = spill_dir
+        self._records = _Table('records', chunk_size, spill_dir)
+        self._records.add_column('time', 'datetime64[ns]', np.datetime64('NaT'))
+        self._records.add_column('equity', np.float64)
+        self._orders = _Table('orders', chunk_size, spill_dir)
+        self._orders.add_column('time', 'datetime64[ns]', np.datetime64('NaT'))
+        self._orders.add_column('symbol', np.int32, -1)
+        for name in ['amount', 'price', 'fee']:
+            self._orders.add_column(name, np.float64)
+        self._symbols = {}
+
+    def record(self, t, equity, positions: dict = None, **metrics):
+        """ record the state of the portfolio at time t
+        :arg equity: value of the portfolio
+        :arg positions: quantity held per symbol
+        :arg metrics: any other value to keep track of
+        """
+        row = {'time': _to_datetime64(t), 'equity': equity}
+        if positions is not None:
+            for symbol, quantity in positions.items():
+                row[('position', symbol)] = quantity
+        for name, value in metrics.items():
+            row[('metric', name)] = value
+        self._records.append(row)
+
+    def record_order(self, t, symbol, amount, price, fee=0.):
+        """ record a filled order
+        :arg amount: signed quantity, positive for a buy and negative for a sell
+        """
+        code = self._symbols.setdefault(symbol, len(self._symbols))
+        self._orders.append({'time': _to_datetime64(t), 'symbol': code,
+                             'amount': amount, 'price': price, 'fee': fee})
+
+    def __len__(self):
+        return self._records.n_rows
+
+    def _frame(self, prefix):
+        columns = self._records.columns
+        index = pd.DatetimeIndex(columns['time'].to_numpy(), name='time')
+        return pd.DataFrame({name[1]: column.to_numpy() for name, column in columns.items()
+                             if isinstance(name, tuple) and name[0] == prefix}, index=index)
+
+    def equity(self) -> pd.Series:
+        columns = self._records.columns
+        return pd.Series(columns['equity'].to_numpy(), name='equity',
+                         index=pd.DatetimeIndex(columns['time'].to_numpy(), name='time'))
+
+    def positions(self) -> pd.DataFrame:
+        return self._frame('position')
+
+    def metrics(self) -> pd.DataFrame:
+        return self._frame('metric')
+
+    def orders(self) -> pd.DataFrame:
+        columns = self._orders.to_dict()
+        symbols = np.array(list(self._symbols), dtype=object)
+        columns['symbol'] = symbols[columns['symbol']] if len(symbols) > 0 else columns['symbol'].astype(object)
+        return pd.DataFrame(columns)
+
+    def summary(self, periods_per_year=None) -> dict:
+        """ performance of the run
+        :arg periods_per_year: number of records per year used to annualize the sharpe ratio, if None it's
+        deduced from the median spacing between records
+        """
+        equity = self.equity()
+        values = equity.to_numpy()
+        if periods_per_year is None:
+            periods_per_year = _periods_per_year(equity.index.values)
+        orders = self._orders.columns
+        notional = np.abs(orders['amount'].to_numpy() * orders['price'].to_numpy())
+        return {'total_return': values[-1] / values[0] - 1 if len(values) > 0 else np.nan,
+                'max_drawdown': max_drawdown(values),
+                'sharpe': sharpe_ratio(returns(values), periods_per_year),
+                'turnover': turnover(notional, values),
+                'fees': float(np.nansum(orders['fee'].to_numpy())),
+                'n_orders': int(notional.shape[0])}
+
+    def close(self):
+        """ remove the spilled chunks if they are in a temporary directory
+        """
+        if self._owns_spill_dir and self.spill_dir is not None:
+            self._finalizer()
+            self.spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# vectorized metrics
+def returns(equity: np.ndarray) -> np.ndarray:
+    return equity[1:] / equity[:-1] - 1
+
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    """ relative distance to the running maximum of the equity
+    """
+    return equity / np.maximum.accumulate(equity) - 1
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    if len(equity) == 0:
+        return np.nan
+    return float(-drawdown(equity).min())
+
+
+def sharpe_ratio(r: np.ndarray, periods_per_year=1) -> float:
+    if len(r) < 2:
+        return np.nan
+    std = r.std(ddof=1)
+    if std == 0:
+        return np.nan
+    return float(r.mean() / std * np.sqrt(periods_per_year))
+
+
+def turnover(notional: np.ndarray, equity: np.ndarray) -> float:
+    """ traded value relative to the average equity
+    """
+    if len(equity) == 0:
+        return np.nan
+    return float(notional.sum() / equity.mean())
+
+
+def _to_datetime64(t):
+    return np.datetime64(pd.Timestamp(t).value, 'ns')
+
+
+def _periods_per_year(times: np.ndarray) -> float:
+    if len(times) < 2:
+        return 1
+    step = np.median(np.diff(times).astype(np.int64))
+    if step <= 0:
+        return 1
+    return pd.Timedelta(days=365).value / step
@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import datetime
+import pandas as pd
+
+# at equal times bars are dispatched before timers, so a timer sees the bars of its timestamp
+_BAR = 0
+_TIMER = 1
+
+
+def _event_time(value) -> pd.Timestamp:
+    """ time of an item yielded by a source: the last row of a history data frame (what DataLoader.test_data
+    yields), the name of a series, or the first element of a (time, value) pair
+    """
+    if isinstance(value, pd.DataFrame):
+        return pd.Timestamp(value.index[-1])
+    if isinstance(value, pd.Series):
+        return pd.Timestamp(value.name)
+    return pd.Timestamp(value[0])
+
+
+class EventScheduler(object):
+    """
+    Merge several data sources (data loaders with different timeframes and symbols) and user timers into one
+    time-ordered stream of events. Only the next event of every source and timer is kept in a heap, so each event
+    is dispatched in O(log n) and a source costs nothing until its next bar is due.
+
+        scheduler = EventScheduler()
+        scheduler.add_data_loader('BTC/USDT-1h', btc_loader, on_btc_bar)
+        scheduler.add_data_loader('ETH/USDT-1m', eth_loader, on_eth_bar)
+        scheduler.every(4, rebalance, source='BTC/USDT-1h')
+        scheduler.at_time('00:00', record_daily)
+        scheduler.run()
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._sources = {}
+        self._bar_callbacks = {}
+        self._timers = []
+        self._n_active = 0
+        self.now = None
+
+    def add_source(self, name, source, callback=None):
+        """ add an iterable of time-ordered items, `callback(time, name, item)` is called for each of them
+        """
+        assert name not in self._sources, f'A source named {name} already exists'
+        self._sources[name] = (iter(source), callback)
+        self._bar_callbacks[name] = []
+        self._n_active += 1
+        self._push_next_bar(name)
+
+    def add_data_loader(self, name, data_loader, callback=None):
+        """ add the test data of a trained DataLoader, the items are the history data frames it yields
+        """
+        self.add_source(name, data_loader.test_data(), callback)
+
+    def every(self, n_bars, callback, source):
+        """ call `callback(time)` every `n_bars` bars of a source
+        """
+        assert n_bars > 0, 'n_bars should be a positive integer'
+        self._bar_callbacks[source].append([n_bars, callback, 0])
+
+    def at_time(self, time_of_day, callback, every=pd.Timedelta(days=1)):
+        """ call `callback(time)` every day at `time_of_day` (a "HH:MM[:SS]" string or a datetime.time), starting
+        from the first bar of the sources
+        :arg every: period of the timer, a day by default
+        """
+        if isinstance(time_of_day, str):
+            time_of_day = datetime.time.fromisoformat(time_of_day)
+        self._timers.append((time_of_day, pd.Timedelta(every), callback))
+
+    def _push_next_bar(self, name):
+        source, _ = self._sources[name]
+        try:
+            item = next(source)
+        except StopIteration:
+            self._n_active -= 1
+            return
+        heapq.heappush(self._heap, (_event_time(item), _BAR, next(self._seq), name, item))
+
+    def _start_timers(self):
+        if len(self._heap) == 0:
+            return
+        first = self._heap[0][0]
+        for time_of_day, every, callback in self._timers:
+            t = first.normalize() + pd.Timedelta(hours=time_of_day.hour, minutes=time_of_day.minute,
+                                                 seconds=time_of_day.second)
+            if t < first:
+                t += every * -(-(first - t) // every)
+            heapq.heappush(self._heap, (t, _TIMER, next(self._seq), every, callback))
+        self._timers = []
+
+    def __iter__(self):
+        """ dispatch the events in time order, yielding (time, source name, item) after each bar is dispatched
+        """
+        self._start_timers()
+        while self._n_active > 0:
+            t, kind, _, a, b = heapq.heappop(self._heap)
+            self.now = t
+            if kind == _TIMER:
+                every, callback = a, b
+                callback(t)
+                heapq.heappush(self._heap, (t + every, _TIMER, next(self._seq), every, callback))
+                continue
+            name, item = a, b
+            callback = self._sources[name][1]
+            if callback is not None:
+                callback(t, name, item)
+            for bar_callback in self._bar_callbacks[name]:
+                bar_callback[2] += 1
+                if bar_callback[2] == bar_callback[0]:
+                    bar_callback[2] = 0
+                    bar_callback[1](t)
+            self._push_next_bar(name)
+            yield t, name, item
+
+    def run(self):
+        """ dispatch every event until all the sources are exhausted
+        :return: the number of dispatched bars
+        """
+        n = 0
+        for _ in self:
+            n += 1
+        return n
@@ -0,0 +1,25 @@
+import threading
+import time
+
+
+class RateLimiter(object):
+    """
+    Space out requests to an exchange by at least `interval` milliseconds, it can be shared between threads
+    """
+
+    def __init__(self, interval, clock=time.time, sleep=time.sleep):
+        self.interval = interval
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """ block until a new request can be sent
+        """
+        with self._lock:
+            now = self._clock() * 1000
+            if now < self._next:
+                self._sleep((self._next - now) / 1000)
+                now = self._next
+            self._next = now + self.interval
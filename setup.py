@@ -2,5 +2,6 @@ from setuptools import setup, find_packages
 
 setup(
     name='ccbacktest',
-    packages=find_packages(), install_requires=['pandas', 'ccxt', 'numpy']
+    packages=find_packages(), install_requires=['pandas', 'ccxt', 'numpy'],
+    extras_require={'zstd': ['zstandard'], 'lz4': ['lz4']}
 )
\ No newline at end of file
@@ -0,0 +1,86 @@
+import io
+import os
+import unittest
+import zipfile
+import numpy as np
+
+from ccbacktest.data.caching import cache_paths, read_status, write_status, read_data, get_diff_and_update
+from ccbacktest.data.archive_import import import_archives, find_archives, parse_archive
+from tests.helpers import MINUTE, DAY, CacheTestCase, candles, minutes
+
+JAN_1 = 1_609_459_200_000  # 2021-01-01 UTC
+
+
+def write_archive(directory, name, times, header=False, time_factor=1):
+    n = len(times)
+    df = candles(np.asarray(times) * time_factor, volume=10.).assign(
+        close_time=np.asarray(times) + MINUTE - 1, quote_volume=15., count=3, taker_buy_volume=5.,
+        taker_buy_quote_volume=7., ignore=0)
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=header)
+    with zipfile.ZipFile(os.path.join(directory, name), 'w') as archive:
+        archive.writestr(name.replace('.zip', '.csv'), buffer.getvalue())
+    return n
+
+
+class ArchiveImportTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.archives = os.path.join(self.directory.name, 'archives')
+        os.makedirs(self.archives)
+
+    def test_parse(self):
+        write_archive(self.archives, 'BTCUSDT-1m-2021-01-01.zip', minutes(JAN_1, 10), header=True, time_factor=1000)
+        df = parse_archive(os.path.join(self.archives, 'BTCUSDT-1m-2021-01-01.zip'))
+        self.assertEqual(list(df.columns), ['open_time', 'open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(list(df.open_time), minutes(JAN_1, 10))
+
+    def test_find_archives(self):
+        for name in ['BTCUSDT-1m-2021-02-01.zip', 'BTCUSDT-1m-2021-01.zip', 'BTCUSDT-1m-2021-01-05.zip',
+                     'BTCUSDT-1h-2021-01.zip', 'ETHUSDT-1m-2021-01.zip', 'BTCUSDT-1m-2021-01.zip.CHECKSUM']:
+            open(os.path.join(self.archives, name), 'w').close()
+        self.assertEqual([os.path.basename(p) for p in find_archives(self.archives, 'BTC/USDT', '1m')],
+                         ['BTCUSDT-1m-2021-01.zip', 'BTCUSDT-1m-2021-02-01.zip'])
+
+    def test_import(self):
+        n = write_archive(self.archives, 'BTCUSDT-1m-2021-01.zip', minutes(JAN_1, 2 * 1440))
+        n += write_archive(self.archives, 'BTCUSDT-1m-2021-02-01.zip',
+                           [t for t in minutes(JAN_1 + 2 * DAY, 1440) if t != JAN_1 + 2 * DAY + 10 * MINUTE])
+        self.assertEqual(import_archives(self.archives, 'BTC/USDT', '1m', max_workers=2), n)
+        path, json_path = cache_paths('binance', 'BTC/USDT', '1m')
+        status = read_status(json_path)
+        self.assertEqual(status['already_downloaded'], [JAN_1, JAN_1 + 3 * DAY - MINUTE])
+        self.assertEqual(status['gaps'], [[JAN_1 + 2 * DAY + 10 * MINUTE] * 2])
+        df = read_data(path, status)
+        self.assertEqual(df.shape[0], n)
+        self.assertTrue((np.diff(df.open_time.values) > 0).all())
+        # only the time after the archives is missing
+        to_download, _ = get_diff_and_update([JAN_1 + DAY, JAN_1 + 4 * DAY], status['already_downloaded'])
+        self.assertEqual(to_download, [[JAN_1 + 3 * DAY - MINUTE, JAN_1 + 4 * DAY]])
+        # importing again doesn't duplicate anything
+        self.assertEqual(import_archives(self.archives, 'BTC/USDT', '1m', max_workers=2), 0)
+
+    def test_import_before_cached_data(self):
+        write_archive(self.archives, 'BTCUSDT-1m-2021-01-02.zip', minutes(JAN_1 + DAY, 1440))
+        import_archives(self.archives, 'BTC/USDT', '1m', max_workers=1)
+        write_archive(self.archives, 'BTCUSDT-1m-2021-01-01.zip', minutes(JAN_1, 1440))
+        self.assertEqual(import_archives(self.archives, 'BTC/USDT', '1m', max_workers=1), 1440)
+        path, json_path = cache_paths('binance', 'BTC/USDT', '1m')
+        status = read_status(json_path)
+        self.assertEqual(status['already_downloaded'], [JAN_1, JAN_1 + 2 * DAY - MINUTE])
+        self.assertEqual(list(read_data(path, status).open_time), minutes(JAN_1, 2 * 1440))
+
+    def test_import_before_legacy_csv_cache(self):
+        # a cache written before the format and the size were recorded in the status
+        path, json_path = cache_paths('binance', 'BTC/USDT', '1m')
+        candles(minutes(JAN_1 + DAY, 100)).to_csv(os.path.splitext(path)[0] + '.csv', index=False)
+        write_status(json_path, {'already_downloaded': [JAN_1 + DAY, JAN_1 + DAY + 99 * MINUTE]})
+        write_archive(self.archives, 'BTCUSDT-1m-2021-01-01.zip', minutes(JAN_1, 1440))
+        self.assertEqual(import_archives(self.archives, 'BTC/USDT', '1m', max_workers=1), 1440)
+        status = read_status(json_path)
+        self.assertEqual(status['already_downloaded'], [JAN_1, JAN_1 + DAY + 99 * MINUTE])
+        self.assertEqual(list(read_data(path, status).open_time), minutes(JAN_1, 1540))
+
+
+if __name__ == '__main__':
+    unittest.main()
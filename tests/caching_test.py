@@ -1,5 +1,8 @@
 import unittest
-from ccbacktest.data.caching import get_diff_and_update
+import numpy as np
+from ccbacktest.data.caching import (get_diff_and_update, validate_ohlcv, merge_sorted, cache_download, cache_bounds,
+                                     cache_paths, read_status)
+from tests.helpers import MINUTE, CacheTestCase, candles
 
 
 class DiffAndUpdateTest(unittest.TestCase):
@@ -27,5 +30,72 @@ class DiffAndUpdateTest(unittest.TestCase):
         self.assertRaises(AssertionError, get_diff_and_update, [0, -1], [4, 8])
 
 
+class ValidateTest(unittest.TestCase):
+    def test_validate(self):
+        times = np.array([0, 1, 2, 2, 5, 6, 10]) * MINUTE
+        volume = np.array([1, 0, 0, 1, 1, 0, 1])
+        report = validate_ohlcv(times, MINUTE, volume)
+        self.assertEqual(report['n_out_of_order'], 0)
+        self.assertEqual(report['n_duplicates'], 1)
+        self.assertEqual(report['gaps'], [[3 * MINUTE, 4 * MINUTE], [7 * MINUTE, 9 * MINUTE]])
+        self.assertEqual(report['zero_volume'], [[MINUTE, 2 * MINUTE], [6 * MINUTE, 6 * MINUTE]])
+        self.assertEqual(validate_ohlcv(times + 1, MINUTE)['n_misaligned'], 7)
+        self.assertEqual(validate_ohlcv(times[::-1])['n_out_of_order'], 5)
+
+    def test_gaps_inside_coverage(self):
+        times = np.array([0, 1, 5, 20, 21, 30]) * MINUTE
+        report = validate_ohlcv(times, MINUTE, coverage=[0, 5 * MINUTE, 20 * MINUTE, 30 * MINUTE])
+        self.assertEqual(report['gaps'], [[2 * MINUTE, 4 * MINUTE], [22 * MINUTE, 29 * MINUTE]])
+
+    def test_merge_sorted(self):
+        df = candles([0, MINUTE, 5 * MINUTE, 6 * MINUTE])
+        parts = [candles([6 * MINUTE, 7 * MINUTE], volume=2.), candles([MINUTE, 2 * MINUTE, 3 * MINUTE], volume=2.)]
+        merged = merge_sorted(df, parts)
+        self.assertEqual(list(merged.open_time), [i * MINUTE for i in [0, 1, 2, 3, 5, 6, 7]])
+        # the downloaded candles replace the cached ones
+        self.assertEqual(list(merged.volume), [1., 2., 2., 2., 1., 2., 2.])
+        # overlapping parts fall back to a full sort
+        merged = merge_sorted(df, [candles([0, 2 * MINUTE, 6 * MINUTE])])
+        self.assertEqual(list(merged.open_time), [i * MINUTE for i in [0, 1, 2, 5, 6]])
+
+
+class FakeBackend(object):
+    """ serves one candle per minute except for the missing ones, returned shuffled with a duplicate
+    """
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    @cache_download('fake', refetch_gaps=True)
+    def download(self, ticker, freq, start, end, format=None):
+        self.calls.append((start, end))
+        times = [t for t in range(-(-start // MINUTE) * MINUTE, end + 1, MINUTE) if t not in self.missing]
+        df = candles(times + times[:1])
+        return df.sample(frac=1, random_state=0)
+
+
+class CacheDownloadTest(CacheTestCase):
+    def test_validation_on_ingest(self):
+        start, end = cache_bounds('2021-01-01 00:00', '2021-01-01 01:00')
+        backend = FakeBackend(missing=[start + 10 * MINUTE, start + 11 * MINUTE])
+        df = backend.download('BTC/USDT', '1m', '2021-01-01 00:00', '2021-01-01 01:00')
+        self.assertEqual(df.shape[0], 59)
+        self.assertTrue((np.diff(df.open_time.values) > 0).all())
+        status = read_status(cache_paths('fake', 'BTC/USDT', '1m')[1])
+        self.assertEqual(status['gaps'], [[start + 10 * MINUTE, start + 11 * MINUTE]])
+        self.assertEqual(status['n_duplicates'], 1)
+        # the gap was fetched once more
+        self.assertEqual(backend.calls, [(start, end), (start + 10 * MINUTE, start + 11 * MINUTE)])
+
+        # extending the range only downloads the new part, and known gaps are not fetched again
+        df = backend.download('BTC/USDT', '1m', '2021-01-01 00:00', '2021-01-01 02:00')
+        self.assertEqual(backend.calls[2:], [(end, end + 60 * MINUTE)])
+        self.assertEqual(df.shape[0], 119)
+        self.assertTrue((np.diff(df.open_time.values) > 0).all())
+        backend.download('BTC/USDT', '1m', '2021-01-01 00:30', '2021-01-01 01:30')
+        self.assertEqual(len(backend.calls), 3)
+
+
 if __name__ == '__main__':
     unittest.main()
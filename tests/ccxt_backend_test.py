@@ -0,0 +1,125 @@
+import os
+import sys
+import unittest
+import numpy as np
+
+from ccbacktest.data.caching import cache_bounds, cache_paths, read_status, read_data
+from ccbacktest.backend.ccxt_backend import CCXTBackend, normalize_ohlcv, download_many
+from ccbacktest.backend.binance_backend import BinanceBackend
+from tests.helpers import MINUTE, HOUR, CacheTestCase, FakeExchange
+
+class FakeTradesExchange(object):
+    """ an exchange returning at most `limit` of the trades in the hour after `since`, like binance's aggTrades
+    """
+    rateLimit = 0
+    id = 'fake'
+
+    def __init__(self, times):
+        self.times = times
+        self.requests = []
+
+    def fetch_trades(self, symbol, since=None, limit=None):
+        self.requests.append(since)
+        times = [t for t in self.times if since <= t < since + HOUR][:limit]
+        return [{'id': str(self.times.index(t)), 'timestamp': t, 'price': 1., 'amount': 1., 'side': 'buy'}
+                for t in times]
+
+
+class CCXTBackendTest(CacheTestCase):
+    def make_backend(self, exchange, **kwargs):
+        self.slept = []
+        return CCXTBackend(exchange, retry_exceptions=ConnectionError, sleep=self.slept.append, **kwargs)
+
+    def test_normalize(self):
+        records = normalize_ohlcv([[2 * MINUTE, 1, 2, 0, 1, None, 'extra'], [MINUTE, 1, 2, 0, 1, 5, 'extra'],
+                                   [MINUTE, 1, 2, 0, 1, 5, 'extra']])
+        self.assertEqual(list(records['open_time']), [MINUTE, 2 * MINUTE])
+        self.assertTrue(np.isnan(records['volume'][1]))
+        self.assertEqual(normalize_ohlcv([]).shape, (0,))
+
+    def test_pages(self):
+        exchange = FakeExchange(limit=100)
+        backend = self.make_backend(exchange)
+        pages = list(backend.iter_ohlcv('BTC/USDT', 0, 250 * MINUTE))
+        self.assertEqual([p.shape[0] for p in pages], [100, 100, 51])
+        self.assertEqual([since for _, since in exchange.requests], [0, 99 * MINUTE + 1, 199 * MINUTE + 1])
+        df = backend.historical_ohlcv('BTC/USDT', 0, 250 * MINUTE)
+        self.assertEqual(list(df.columns), ['open_time', 'open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(df.shape[0], 251)
+
+    def test_retries(self):
+        backend = self.make_backend(FakeExchange(failures=2), backoff=0.5)
+        self.assertEqual(backend.fetch_page('BTC/USDT', '1m', 0).shape[0], 100)
+        self.assertEqual(self.slept, [0.5, 1.])
+        backend = self.make_backend(FakeExchange(failures=3), retries=2)
+        self.assertRaises(ConnectionError, backend.fetch_page, 'BTC/USDT', '1m', 0)
+
+    @unittest.skipIf('ccxt' in sys.modules, 'ccxt is already imported')
+    def test_default_retry_exceptions(self):
+        self.slept = []
+        backend = CCXTBackend(FakeExchange(failures=1), sleep=self.slept.append)
+        self.assertEqual(backend.fetch_page('BTC/USDT', '1m', 0).shape[0], 100)
+        self.assertEqual(self.slept, [1.])
+
+    def test_download_many(self):
+        backends = [self.make_backend(FakeExchange('fake1')), self.make_backend(FakeExchange('fake2'))]
+        requests = [(backend, ticker, '1m', '2021-01-01 00:00', '2021-01-01 05:00')
+                    for backend in backends for ticker in ['BTC/USDT', 'ETH/USDT']]
+        frames = download_many(requests, max_workers=4)
+        self.assertEqual([df.shape[0] for df in frames], [301] * 4)
+        start, end = cache_bounds('2021-01-01 00:00', '2021-01-01 05:00')
+        # each exchange is cached under its id
+        for name in ['fake1', 'fake2']:
+            status = read_status(cache_paths(name, 'ETH/USDT', '1m')[1])
+            self.assertEqual(status['already_downloaded'], [start, end])
+
+    def test_download_many_same_ticker(self):
+        backend = self.make_backend(FakeExchange())
+        bounds = [(f'2021-01-0{day} 00:00', f'2021-01-0{day + 1} 02:00') for day in range(1, 6)]
+        requests = [(backend, 'BTC/USDT', '1m', start, end) for start, end in bounds]
+        frames = download_many(requests, max_workers=5)
+        self.assertEqual([df.shape[0] for df in frames], [26 * 60 + 1] * 5)
+        path, json_path = cache_paths('fake', 'BTC/USDT', '1m')
+        status = read_status(json_path)
+        first, _ = cache_bounds(*bounds[0])
+        _, last = cache_bounds(*bounds[-1])
+        self.assertEqual(status['already_downloaded'], [first, last])
+        df = read_data(path, status)
+        self.assertEqual(list(df.open_time), list(range(first, last + 1, MINUTE)))
+        # no temporary file is left behind
+        self.assertEqual(sorted(os.listdir(os.path.dirname(path))), ['USDT-1m.ccb', 'USDT-1m.json', 'USDT-1m.lock'])
+
+    def test_get_historical_data(self):
+        backend = self.make_backend(FakeExchange())
+        df = backend.get_historical_data('BTC/USDT', '1m', '2021-01-01 00:00', '2021-01-01 05:00')
+        self.assertEqual(df.shape, (301, 5))
+        self.assertEqual(df.index.name, 'open_time')
+
+    def test_empty_range(self):
+        exchange = FakeExchange(limit=0)
+        df = self.make_backend(exchange).download('BTC/USDT', '1m', '2021-01-01 00:00', '2021-01-01 05:00')
+        self.assertEqual(df.shape, (0, 5))
+        self.assertEqual(df.index.name, 'open_time')
+
+    def test_refetch_gaps(self):
+        start, end = cache_bounds('2021-01-01 00:00', '2021-01-01 01:00')
+        for refetch_gaps, n_requests in [(False, 1), (True, 2)]:
+            exchange = FakeExchange(f'fake{n_requests}', missing=[start + 10 * MINUTE])
+            backend = self.make_backend(exchange, refetch_gaps=refetch_gaps)
+            backend.download('BTC/USDT', '1m', '2021-01-01 00:00', '2021-01-01 01:00')
+            self.assertEqual(len(exchange.requests), n_requests)
+            if refetch_gaps:
+                self.assertEqual(exchange.requests[-1][1], start + 10 * MINUTE)
+
+    def test_download_trades(self):
+        # a quiet first hour, an hour without trades, then a busy hour spanning several pages
+        times = [10 * MINUTE, 20 * MINUTE] + [2 * HOUR + i * 1000 for i in range(25)] + [4 * HOUR]
+        exchange = FakeTradesExchange(times)
+        backend = BinanceBackend(exchange, retry_exceptions=ConnectionError)
+        store = backend.download_trades('BTC/USDT', 0, 3 * HOUR, limit=10)
+        np.testing.assert_array_equal(store.read()['time'], times[:-1])
+        self.assertEqual(exchange.requests[:3], [0, HOUR, 2 * HOUR])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+
+from ccbacktest.data import caching, codec
+from ccbacktest.data.caching import cache_paths, read_status, read_data, write_data, append_data, write_status
+from tests.helpers import CacheTestCase, make_candles
+
+
+class CodecTest(unittest.TestCase):
+    def test_delta(self):
+        values = np.array([1000, 2000, 3000, 5000, 5001, 4000], dtype=np.int64)
+        encoded = codec.delta_encode(values)
+        self.assertEqual(list(encoded[:4]), [1000, 1000, 0, 1000])
+        np.testing.assert_array_equal(codec.delta_decode(encoded), values)
+
+    def test_round_trip(self):
+        df = make_candles()
+        for name in codec.available_codecs():
+            decoded = codec.decode(codec.encode(df, name))
+            pd.testing.assert_frame_equal(decoded, df)
+
+    def test_blocks(self):
+        df = make_candles(100)
+        first, second = codec.encode(df.iloc[:60]), codec.encode(df.iloc[60:])
+        pd.testing.assert_frame_equal(codec.decode(first + second), df)
+        # an unfinished block is ignored
+        pd.testing.assert_frame_equal(codec.decode(first + second[:20]), df.iloc[:60])
+        self.assertTrue(codec.decode(b'').empty)
+
+    def test_smaller_than_csv(self):
+        df = make_candles(10_000)
+        self.assertLess(len(codec.encode(df)), len(df.to_csv(index=False).encode()) / 2)
+
+
+class CacheFormatTest(CacheTestCase):
+    def test_append(self):
+        df = make_candles(100)
+        path, json_path = cache_paths('binance', 'BTC/USDT', '1m')
+        self.assertTrue(path.endswith('.ccb'))
+        status = {'format': 'ccb', 'n_bytes': write_data(path, df.iloc[:50])}
+        status['n_bytes'] = append_data(path, df.iloc[50:], status)
+        pd.testing.assert_frame_equal(read_data(path, status), df)
+
+    def test_appends_are_compacted(self):
+        df = make_candles(500)
+        path, _ = cache_paths('binance', 'BTC/USDT', '1m')
+        status = {'format': 'ccb', 'n_bytes': write_data(path, df.iloc[:100])}
+        blocks = caching.BLOCK_ROWS
+        caching.BLOCK_ROWS = 64
+        try:
+            for i in range(100, 500):
+                status['n_bytes'] = append_data(path, df.iloc[i:i + 1], status)
+                with open(path, 'rb') as f:
+                    n_rows = [n for _, _, n in codec.iter_blocks(f)]
+                small = len(n_rows) - next((j for j in range(len(n_rows), 0, -1) if n_rows[j - 1] >= 64), 0)
+                self.assertLess(small, caching.COMPACT_BLOCKS)
+        finally:
+            caching.BLOCK_ROWS = blocks
+        self.assertEqual(os.path.getsize(path), status['n_bytes'])
+        self.assertEqual(n_rows[:7], [100, 64, 64, 64, 64, 64, 64])
+        pd.testing.assert_frame_equal(read_data(path, status), df)
+
+    def test_csv_cache_is_converted(self):
+        df = make_candles(100)
+        caching.CACHE_FORMAT = 'csv'
+        csv_path, json_path = cache_paths('binance', 'BTC/USDT', '1m')
+        # a status written before the format was recorded
+        write_status(json_path, {'n_bytes': write_data(csv_path, df)})
+        caching.CACHE_FORMAT = 'ccb'
+        path, _ = cache_paths('binance', 'BTC/USDT', '1m')
+        status = read_status(json_path)
+        pd.testing.assert_frame_equal(read_data(path, status), df)
+        status['n_bytes'] = write_data(path, df, status)
+        self.assertFalse(os.path.exists(csv_path))
+        status['format'] = 'ccb'
+        pd.testing.assert_frame_equal(read_data(path, status), df)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import threading
+import numpy as np
+import pandas as pd
+
+from ccbacktest.data.data_loader import DataLoader, PrefetchDataLoader, NotTrainedYetError
+
+
+class FakeBackend(object):
+    """ a backend serving a random hourly ohlcv dataset, bounds are inclusive like the cached backends
+    """
+
+    def __init__(self, n=200):
+        index = pd.date_range('2021-01-01', periods=n, freq='h', name='open_time')
+        self.data = pd.DataFrame(np.random.random((n, 5)), index=index,
+                                 columns=['open', 'high', 'low', 'close', 'volume'])
+        self.calls = []
+        self.threads = set()
+
+    def download(self, ticker, timeframe, start, end=None, format=None):
+        self.calls.append((start, end))
+        self.threads.add(threading.get_ident())
+        return self.data[(self.data.index >= start) & (self.data.index <= end)]
+
+
+class PrefetchDataLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend()
+        self.kwargs = dict(timeframe='1h', start='2021-01-01', train_end='2021-01-03',
+                           test_end='2021-01-08', window=10, symbol='BTC/USDT')
+
+    def test_same_output_as_data_loader(self):
+        loader = DataLoader(self.backend, **self.kwargs)
+        loader.train_data()
+        expected = list(loader.test_data())
+        prefetch = PrefetchDataLoader(self.backend, chunk_size=7, lookahead=2, **self.kwargs)
+        prefetch.train_data()
+        result = list(prefetch.test_data())
+        self.assertEqual(len(result), len(expected))
+        for r, e in zip(result, expected):
+            pd.testing.assert_frame_equal(r, e)
+
+    def test_walk_forward(self):
+        loader = DataLoader(self.backend, **self.kwargs)
+        prefetch = PrefetchDataLoader(self.backend, chunk_size=7, lookahead=2, **self.kwargs)
+        for consume_first in [True, False]:
+            for l in [loader, prefetch]:
+                l.train_end, l.test_end = '2021-01-03', '2021-01-05'
+                l.train_data()
+                if consume_first:
+                    list(l.test_data())
+                # next period, re-trained before or after the previous test data was consumed
+                l.train_end, l.test_end = '2021-01-05', '2021-01-08'
+                l.train_data()
+            expected = list(loader.test_data())
+            result = list(prefetch.test_data())
+            self.assertEqual(len(result), 73)
+            self.assertEqual(result[0].index[-1], pd.Timestamp('2021-01-05'))
+            self.assertEqual(len(result), len(expected))
+            for r, e in zip(result, expected):
+                pd.testing.assert_frame_equal(r, e)
+
+    def test_downloaded_once_in_background(self):
+        loader = PrefetchDataLoader(self.backend, chunk_size=24, lookahead=1, **self.kwargs)
+        loader.train_data()
+        self.assertEqual(len(list(loader.test_data())), 121)
+        # one call for the train data, one for the whole test period, from another thread
+        self.assertEqual(len(self.backend.calls), 2)
+        self.assertEqual(len(self.backend.threads), 2)
+
+    def test_early_stop(self):
+        loader = PrefetchDataLoader(self.backend, chunk_size=5, lookahead=1, **self.kwargs)
+        loader.train_data()
+        gen = loader.test_data()
+        next(gen)
+        gen.close()
+        self.assertIsNone(loader._thread)
+
+    def test_errors_are_raised(self):
+        def fail(*args, **kwargs):
+            raise ConnectionError('network down')
+
+        loader = PrefetchDataLoader(self.backend, **self.kwargs)
+        loader.train_data()
+        loader.stop_prefetch()
+        self.backend.download = fail
+        self.assertRaises(ConnectionError, list, loader.test_data())
+
+    def test_not_trained(self):
+        loader = PrefetchDataLoader(self.backend, **self.kwargs)
+        self.assertRaises(NotTrainedYetError, list, loader.test_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
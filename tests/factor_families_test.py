@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from ccbacktest.factors.factors import MA, RSI, VWAP, MACD
+from ccbacktest.factors.families import MovingAverageFamily, RSIFamily, VWAPFamily, MACDFamily, rolling_sums
+from ccbacktest.pipeline.pipelines import MultiFactorPipeline
+
+
+def make_ohlcv(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    open_ = 20000 + np.cumsum(rng.normal(size=n))
+    close = open_ + rng.normal(size=n)
+    return pd.DataFrame({'open': open_, 'high': np.maximum(open_, close) + 1, 'low': np.minimum(open_, close) - 1,
+                         'close': close, 'volume': rng.random(n) * 10 + 1},
+                        index=pd.date_range('2021-01-01', periods=n, freq='1min'))
+
+
+class FactorFamiliesTest(unittest.TestCase):
+    def setUp(self):
+        self.df = make_ohlcv()
+
+    def assert_same(self, expected: pd.Series, actual: pd.Series):
+        np.testing.assert_allclose(actual.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64),
+                                   rtol=1e-9, atol=1e-9)
+
+    def test_rolling_sums(self):
+        values = np.arange(10, dtype=np.float64)
+        values[6] = np.nan
+        result = rolling_sums(values, [1, 3])
+        expected = pd.Series(values)
+        self.assert_same(expected.rolling(1).sum(), pd.Series(result[:, 0]))
+        self.assert_same(expected.rolling(3).sum(), pd.Series(result[:, 1]))
+
+    def test_moving_averages(self):
+        result = MovingAverageFamily(range(2, 50)).apply(self.df)
+        self.assertEqual(result.shape, (self.df.shape[0], 48))
+        for p in [2, 17, 49]:
+            self.assert_same(MA(p).func(self.df), result[f'MA_{p}'])
+
+    def test_rsi(self):
+        result = RSIFamily([5, 14, 30]).apply(self.df)
+        for p in [5, 14, 30]:
+            self.assert_same(RSI(p).func(self.df), result[f'RSI_{p}'])
+
+    def test_vwap(self):
+        result = VWAPFamily([3, 10]).apply(self.df)
+        for p in [3, 10]:
+            self.assert_same(VWAP(p).func(self.df), result[f'VWAP_{p}'])
+
+    def test_macd(self):
+        result = MACDFamily([(5, 20), (10, 20), (12, 26)]).apply(self.df)
+        for fast, slow in [(5, 20), (10, 20), (12, 26)]:
+            expected = MACD(fast, slow).func(self.df)
+            for kind in ['fast', 'slow']:
+                name = f'MACD_{fast}_{slow}'
+                self.assert_same(expected[name, kind], result[name, kind])
+
+    def test_step(self):
+        family = MovingAverageFamily([3, 7])
+        family.apply(self.df.iloc[:100])
+        for i in range(100, 110):
+            value = family.step(self.df.iloc[i])
+            self.assertEqual(value.name, self.df.index[i])
+            self.assertAlmostEqual(value['MA_7'], self.df.close.iloc[i - 6:i + 1].mean())
+            self.assertAlmostEqual(value['MA_3'], self.df.close.iloc[i - 2:i + 1].mean())
+
+    def test_pipeline(self):
+        pipeline = MultiFactorPipeline([MovingAverageFamily([5, 10]), RSIFamily([14]),
+                                        MACDFamily([(5, 10)])], name='sweep')
+        result = pipeline.apply(self.df)
+        self.assertIn(('sweep', 'MA_10', ''), result.columns)
+        self.assertIn(('sweep', 'MACD_5_10', 'fast'), result.columns)
+        self.assert_same(MA(10).func(self.df), result['sweep', 'MA_10', ''])
+
+
+if __name__ == '__main__':
+    unittest.main()
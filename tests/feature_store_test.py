@@ -0,0 +1,113 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from ccbacktest.data.feature_store import (FeatureStore, FeatureStoreClient, FeatureStoreManager,
+                                           FeatureStoreFullError, feature_key, attach)
+
+
+def make_frame(n=100, columns=('open', 'close')):
+    index = pd.date_range('2021-01-01', periods=n, freq='h', name='open_time')
+    return pd.DataFrame(np.random.random((n, len(columns))), index=index, columns=list(columns))
+
+
+class FeatureStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = FeatureStore(memory_limit=10_000)
+
+    def tearDown(self):
+        self.store.clear()
+
+    def test_put_and_attach(self):
+        df = make_frame()
+        key = feature_key('BTC/USDT', '1h', None, df.index[0], df.index[-1])
+        self.store.put(key, df)
+        with attach(self.store.acquire(key)) as shared:
+            pd.testing.assert_frame_equal(shared.frame, df, check_freq=False)
+            self.assertFalse(shared.frame.values.flags.writeable)
+            with self.assertRaises(ValueError):
+                shared.frame.values[0, 0] = 0
+
+    def test_multiindex_columns(self):
+        df = make_frame(columns=('a', 'b'))
+        df.columns = pd.MultiIndex.from_tuples([('MACD', 'fast'), ('MACD', 'slow')])
+        self.store.put('macd', df)
+        with attach(self.store.acquire('macd')) as shared:
+            pd.testing.assert_frame_equal(shared.frame, df, check_freq=False)
+
+    def test_lru_eviction(self):
+        # each frame takes 100 x 3 x 8 = 2400 bytes, the store can hold 4 of them
+        for i in range(4):
+            self.store.put(i, make_frame())
+        self.store.release(1)
+        self.store.release(0)
+        self.store.acquire(1)
+        self.store.release(1)
+        self.store.put(4, make_frame())
+        # 0 is the least recently used unreferenced frame
+        self.assertEqual(sorted(self.store.keys()), [1, 2, 3, 4])
+        self.store.put(5, make_frame())
+        self.assertEqual(sorted(self.store.keys()), [2, 3, 4, 5])
+        self.assertRaises(FeatureStoreFullError, self.store.put, 6, make_frame())
+
+    def test_client_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return make_frame()
+
+        client = FeatureStoreClient(self.store)
+        first = client.get('key', compute)
+        second = client.get('key', compute)
+        self.assertEqual(len(calls), 1)
+        pd.testing.assert_frame_equal(first.frame, second.frame)
+        first.close()
+        second.close()
+        self.assertEqual(self.store._entries['key'].refcount, 0)
+
+    def test_frame_outlives_close(self):
+        client = FeatureStoreClient(self.store)
+        df = make_frame()
+        with client.get('key', lambda: df) as shared:
+            frame = shared.frame
+            close = frame['close']
+        self.assertEqual(self.store._entries['key'].refcount, 0)
+        # the block is unlinked from the store, the views taken before close still map it
+        self.store.clear()
+        self.assertAlmostEqual(frame['open'].sum(), df['open'].sum())
+        np.testing.assert_array_equal(close.values, df['close'].values)
+        del frame, close
+
+    def test_client_falls_back_to_local_frame(self):
+        client = FeatureStoreClient(self.store)
+        # another worker allocated the key but didn't commit it yet
+        self.store.allocate('key', (100, 2), ['open', 'close'])
+        df = make_frame()
+        with client.get('key', lambda: df) as local:
+            pd.testing.assert_frame_equal(local.frame, df)
+        self.store.release('key')
+        # the store is full of referenced frames
+        for i in range(4):
+            self.store.put(i, make_frame())
+        local = client.get('other', lambda: df)
+        pd.testing.assert_frame_equal(local.frame, df)
+        local.close()
+        self.assertNotIn('other', self.store.keys())
+
+
+class FeatureStoreManagerTest(unittest.TestCase):
+    def test_manager(self):
+        with FeatureStoreManager() as manager:
+            store = manager.FeatureStore(10_000)
+            client = FeatureStoreClient(store)
+            df = make_frame()
+            shared = client.get('key', lambda: df)
+            pd.testing.assert_frame_equal(shared.frame, df, check_freq=False)
+            shared.close()
+            self.assertEqual(store.keys(), ['key'])
+            store.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+""" fixtures shared by the tests of the cache, the backends and the updater
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from ccbacktest.data import caching
+
+MINUTE = 60_000
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+def candles(times, volume=1.):
+    """ constant candles at the given open times
+    """
+    times = np.asarray(times, dtype=np.int64)
+    return pd.DataFrame({'open_time': times, 'open': 1., 'high': 2., 'low': .5, 'close': 1.5, 'volume': volume})
+
+
+def make_candles(n=1000, start=0):
+    """ random walk 1m candles with one missing candle in the middle
+    """
+    open_time = start + np.arange(n, dtype=np.int64) * MINUTE
+    open_time[n // 2:] += MINUTE
+    close = 100 + np.cumsum(np.random.randn(n))
+    return pd.DataFrame({'open_time': open_time, 'open': close + 1, 'high': close + 2, 'low': close - 2,
+                         'close': close, 'volume': np.random.random(n) * 10})
+
+
+def minutes(start, n):
+    return [start + i * MINUTE for i in range(n)]
+
+
+class CacheTestCase(unittest.TestCase):
+    """ a test case caching into a temporary directory (`self.directory`), the cache settings are restored after
+    each test
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self._cache_settings = caching.CACHE_DIRECTORY, caching.CACHE_FORMAT
+        caching.CACHE_DIRECTORY = os.path.join(self.directory.name, 'cache')
+
+    def tearDown(self):
+        caching.CACHE_DIRECTORY, caching.CACHE_FORMAT = self._cache_settings
+        self.directory.cleanup()
+
+
+class FakeClock(object):
+    def __init__(self, now):
+        self.now = now
+        self.slept = 0
+
+    def time(self):
+        return self.now / 1000
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds * 1000
+
+
+class FakeExchange(object):
+    """ an exchange with one 1m candle per minute, returning pages of `limit` candles (the requested limit if
+    any), without the `missing` candles, and failing the first `failures` requests. With a clock, the candles
+    stop at the one open at the clock's time, which is not closed yet
+    """
+
+    def __init__(self, id='fake', limit=100, failures=0, missing=(), clock=None, rate_limit=0):
+        self.id = id
+        self.limit = limit
+        self.failures = failures
+        self.missing = set(missing)
+        self.clock = clock
+        self.rateLimit = rate_limit
+        # (symbol, since) of each request
+        self.requests = []
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.requests.append((symbol, since))
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError('timeout')
+        first = -(-since // MINUTE) * MINUTE
+        end = first + (limit if limit is not None else self.limit) * MINUTE
+        if self.clock is not None:
+            end = min(end, int(self.clock.now) + 1)
+        return [[t, 1., 2., 0.5, 1.5, 10.] for t in range(first, end, MINUTE) if t not in self.missing]
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+import unittest
+
+# import time allowed for the package modules on top of pandas and numpy, in seconds
+IMPORT_BUDGET = 0.5
+
+_SCRIPT = """
+import sys, time
+import numpy, pandas
+t = time.perf_counter()
+import {modules}
+print(time.perf_counter() - t)
+print('ccxt' in sys.modules)
+"""
+
+
+def import_time(*modules):
+    """ time the import of modules in a fresh interpreter, pandas and numpy being already imported
+    :return: (import time in seconds, whether ccxt was imported)
+    """
+    output = subprocess.run([sys.executable, '-c', _SCRIPT.format(modules=', '.join(modules))],
+                            check=True, capture_output=True, text=True).stdout.split()
+    return float(output[0]), output[1] == 'True'
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_data_loader_and_factors(self):
+        elapsed, ccxt_imported = import_time('ccbacktest.data.data_loader', 'ccbacktest.factors.factors',
+                                             'ccbacktest.pipeline.pipelines')
+        self.assertFalse(ccxt_imported)
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+    def test_backends_do_not_import_ccxt(self):
+        elapsed, ccxt_imported = import_time('ccbacktest.backend.binance_backend', 'ccbacktest.backend.cache_backend')
+        self.assertFalse(ccxt_imported)
+        self.assertLess(elapsed, IMPORT_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
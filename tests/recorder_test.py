@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from ccbacktest.strategy.recorder import ResultsRecorder, ColumnBuffer, max_drawdown, sharpe_ratio
+
+
+class ColumnBufferTest(unittest.TestCase):
+    def test_grow_and_spill(self):
+        directory = tempfile.TemporaryDirectory()
+        for spill_dir in [None, directory.name]:
+            buffer = ColumnBuffer('test', np.float64, chunk_size=16, spill_dir=spill_dir, capacity=2)
+            buffer.fill(-1., 5)
+            for i in range(100):
+                buffer.append(i)
+            self.assertEqual(len(buffer), 105)
+            np.testing.assert_array_equal(buffer.to_numpy(), np.r_[[-1.] * 5, np.arange(100)])
+            if spill_dir is not None:
+                self.assertEqual(len(os.listdir(spill_dir)), 6)
+        directory.cleanup()
+
+
+class ResultsRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.recorder = ResultsRecorder(chunk_size=8)
+        self.times = pd.date_range('2021-01-01', periods=50, freq='D')
+        self.equity = 100 + np.sin(np.arange(50)) * 10 + np.arange(50)
+        for i, t in enumerate(self.times):
+            positions = {'BTC': i} if i < 20 else {'BTC': i, 'ETH': -i}
+            self.recorder.record(t, self.equity[i], positions, leverage=1.5)
+            if i % 10 == 0:
+                self.recorder.record_order(t, 'BTC' if i < 20 else 'ETH', 2., 50., fee=0.1)
+
+    def tearDown(self):
+        self.recorder.close()
+
+    def test_frames(self):
+        pd.testing.assert_series_equal(self.recorder.equity(),
+                                       pd.Series(self.equity, index=pd.DatetimeIndex(self.times.values.astype('datetime64[ns]'), name='time'),
+                                                 name='equity'), check_freq=False)
+        positions = self.recorder.positions()
+        self.assertEqual(list(positions.columns), ['BTC', 'ETH'])
+        self.assertTrue(positions['ETH'].iloc[:20].isna().all())
+        self.assertEqual(positions['ETH'].iat[-1], -49)
+        self.assertTrue((self.recorder.metrics()['leverage'] == 1.5).all())
+        orders = self.recorder.orders()
+        self.assertEqual(list(orders.symbol), ['BTC', 'BTC', 'ETH', 'ETH', 'ETH'])
+
+    def test_summary(self):
+        summary = self.recorder.summary()
+        drawdown = (pd.Series(self.equity) / pd.Series(self.equity).cummax() - 1).min()
+        self.assertAlmostEqual(summary['max_drawdown'], -drawdown)
+        r = pd.Series(self.equity).pct_change().dropna()
+        self.assertAlmostEqual(summary['sharpe'], r.mean() / r.std() * np.sqrt(365))
+        self.assertAlmostEqual(summary['turnover'], 5 * 100 / self.equity.mean())
+        self.assertAlmostEqual(summary['fees'], 0.5)
+
+    def test_spill_dir_removed(self):
+        spill_dir = self.recorder.spill_dir
+        self.assertGreater(len(os.listdir(spill_dir)), 0)
+        self.recorder.close()
+        self.assertFalse(os.path.exists(spill_dir))
+
+    def test_metrics(self):
+        self.assertEqual(max_drawdown(np.array([1., 2., 1., 3.])), 0.5)
+        self.assertTrue(np.isnan(sharpe_ratio(np.array([0.1]))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import pandas as pd
+
+from ccbacktest.strategy.scheduler import EventScheduler
+
+
+def bars(start, periods, freq):
+    return [(t, i) for i, t in enumerate(pd.date_range(start, periods=periods, freq=freq))]
+
+
+class EventSchedulerTest(unittest.TestCase):
+    def test_merge_sources(self):
+        scheduler = EventScheduler()
+        scheduler.add_source('1h', bars('2021-01-01', 48, 'h'))
+        scheduler.add_source('15min', bars('2021-01-01 12:00', 20, '15min'))
+        scheduler.add_source('empty', [])
+        events = list(scheduler)
+        self.assertEqual(len(events), 68)
+        times = [t for t, _, _ in events]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(sum(name == '15min' for _, name, _ in events), 20)
+
+    def test_data_frame_items(self):
+        index = pd.date_range('2021-01-01', periods=10, freq='h')
+        frames = [pd.DataFrame({'close': range(i + 1)}, index=index[:i + 1]) for i in range(10)]
+        received = []
+        scheduler = EventScheduler()
+        scheduler.add_source('frames', frames, lambda t, name, df: received.append(t))
+        self.assertEqual(scheduler.run(), 10)
+        self.assertEqual(received, list(index))
+
+    def test_every_n_bars(self):
+        calls = []
+        scheduler = EventScheduler()
+        scheduler.add_source('1h', bars('2021-01-01', 10, 'h'))
+        scheduler.add_source('1min', bars('2021-01-01', 600, 'min'))
+        scheduler.every(4, calls.append, source='1h')
+        scheduler.run()
+        self.assertEqual(calls, [pd.Timestamp('2021-01-01 03:00'), pd.Timestamp('2021-01-01 07:00')])
+
+    def test_at_time(self):
+        calls = []
+        seen = []
+        scheduler = EventScheduler()
+        scheduler.add_source('1h', bars('2021-01-01 05:00', 72, 'h'), lambda t, name, item: seen.append(t))
+        scheduler.at_time('06:30', lambda t: calls.append((t, seen[-1])))
+        scheduler.at_time('05:00', lambda t: calls.append((t, seen[-1])), every=pd.Timedelta(hours=12))
+        scheduler.run()
+        self.assertEqual([t for t, _ in calls], list(pd.to_datetime([
+            '2021-01-01 05:00', '2021-01-01 06:30', '2021-01-01 17:00', '2021-01-02 05:00', '2021-01-02 06:30',
+            '2021-01-02 17:00', '2021-01-03 05:00', '2021-01-03 06:30', '2021-01-03 17:00'])))
+        # timers are dispatched after the bars of the same timestamp
+        self.assertTrue(all(last <= t for t, last in calls))
+        self.assertEqual(calls[0][1], pd.Timestamp('2021-01-01 05:00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+
+from ccbacktest.data.trades import TradeStore, TRADE_DTYPE, trades_from_ccxt
+from ccbacktest.portfolio.fills import FillSimulator, BUY, SELL
+from tests.helpers import CacheTestCase
+
+
+def make_trades(times, prices, amounts, buyer_maker, first_id=0):
+    trades = np.empty(len(times), dtype=TRADE_DTYPE)
+    trades['id'] = np.arange(first_id, first_id + len(times))
+    trades['time'] = times
+    trades['price'] = prices
+    trades['amount'] = amounts
+    trades['is_buyer_maker'] = buyer_maker
+    return trades
+
+
+class TradeStoreTest(CacheTestCase):
+    def test_append_and_stream(self):
+        store = TradeStore('binance', 'BTC/USDT')
+        trades = make_trades(np.arange(1000) * 10, np.random.random(1000), np.random.random(1000),
+                             np.random.random(1000) > 0.5)
+        self.assertEqual(store.append(trades[:600]), 600)
+        # the overlap with the stored trades is dropped
+        self.assertEqual(store.append(trades[500:]), 400)
+        np.testing.assert_array_equal(store.read(), trades)
+        chunks = list(store.iter_chunks(start=95, end=5000, chunk_size=100))
+        self.assertEqual([c.shape[0] for c in chunks], [100, 100, 100, 100, 91])
+        np.testing.assert_array_equal(np.concatenate(chunks), trades[10:501])
+        self.assertRaises(ValueError, store.append, make_trades([0], [1.], [1.], [True], first_id=2000))
+
+    def test_from_ccxt(self):
+        trades = trades_from_ccxt([{'id': '12', 'timestamp': 1000, 'price': 10., 'amount': 2., 'side': 'sell'},
+                                   {'id': '13', 'timestamp': 1001, 'price': 11., 'amount': 1., 'side': 'buy'}])
+        self.assertEqual(list(trades['is_buyer_maker']), [True, False])
+        self.assertEqual(list(trades['id']), [12, 13])
+
+
+class FillSimulatorTest(unittest.TestCase):
+    def test_queue_position(self):
+        simulator = FillSimulator()
+        order = simulator.submit(10, BUY, 3., price=100., queue_ahead=5.)
+        trades = make_trades([0, 10, 20, 30, 40, 50],
+                             [100., 100., 100., 101., 100., 100.],
+                             [10., 4., 2., 10., 1., 5.],
+                             [True, True, False, False, True, True])
+        # 4 units consume the queue, the buyer-taker trade doesn't hit the bid, 1 unit finishes the queue
+        simulator.process(trades[:5])
+        self.assertEqual(simulator.open_orders, {order: 3.})
+        simulator.process(trades[5:])
+        fills = simulator.fills()
+        self.assertEqual(list(fills.time), [50])
+        self.assertEqual(list(fills.amount), [3.])
+        self.assertEqual(simulator.open_orders, {})
+
+    def test_trade_through(self):
+        simulator = FillSimulator()
+        simulator.submit(0, SELL, 5., price=100., queue_ahead=100.)
+        trades = make_trades([0, 1, 2], [100., 100.5, 100.], [2., 3., 4.], [False, False, False])
+        fills = simulator.run([trades])
+        # the level is traded through at 100.5, the queue is cleared
+        self.assertEqual(list(fills.time), [1, 2])
+        self.assertEqual(list(fills.amount), [3., 2.])
+        self.assertEqual(list(fills.price), [100., 100.])
+
+    def test_market_order(self):
+        simulator = FillSimulator()
+        simulator.submit(5, BUY, 3.)
+        fills = simulator.run([make_trades([0, 6, 7], [1., 2., 3.], [5., 1., 5.], [True, False, False])])
+        self.assertEqual(list(fills.price), [2., 3.])
+        self.assertEqual(list(fills.amount), [1., 2.])
+
+    def test_orders_share_trades(self):
+        simulator = FillSimulator()
+        first = simulator.submit(0, BUY, 1., price=100.)
+        second = simulator.submit(0, BUY, 1., price=100.)
+        simulator.process(make_trades([1], [100.], [1.], [True]))
+        # the second order queues behind the first one, a 1 unit trade fills only one of them
+        self.assertEqual(simulator.open_orders, {second: 1.})
+        self.assertEqual(list(simulator.fills().order_id), [first])
+        simulator.submit(2, BUY, 2.)
+        fills = simulator.run([make_trades([3, 4], [100., 101.], [0.5, 2.], [True, False])])
+        # the market order takes the 2 units of the second trade, the limit order gets the first one
+        self.assertEqual(list(fills.amount), [1., 0.5, 2.])
+        self.assertEqual(simulator.open_orders, {second: 0.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
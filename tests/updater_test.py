@@ -0,0 +1,132 @@
+import os
+import unittest
+
+from ccbacktest.data.caching import cache_paths, cache_bounds, cache_download, read_status, read_data
+from ccbacktest.data.updater import CacheUpdater
+from tests.helpers import MINUTE, CacheTestCase, FakeClock, FakeExchange, candles
+
+class FakeBackend(object):
+    """ a backtest's backend downloading into the same cache as the updater
+    """
+    name = 'binance'
+
+    @cache_download()
+    def download(self, ticker, freq, start, end, format=None):
+        return candles(range(start, end + 1, MINUTE))
+
+
+class BacktestDuringFetch(FakeExchange):
+    """ an exchange during whose first request a backtest downloads an earlier range into the cache
+    """
+
+    def __init__(self, clock, start, end):
+        super().__init__(clock=clock)
+        self.bounds = (start, end)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=1000):
+        if self.bounds is not None:
+            FakeBackend().download(symbol, timeframe, *self.bounds)
+            self.bounds = None
+        return super().fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+
+class InvalidPages(FakeExchange):
+    """ an exchange returning pages out of order, with a duplicate and a misaligned candle
+    """
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=1000):
+        page = super().fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        if len(page) < 2:
+            return page
+        return page[::-1] + [page[0], [page[0][0] + 1000] + page[0][1:]]
+
+
+class CacheUpdaterTest(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock(1000 * MINUTE)
+        self.exchange = FakeExchange(clock=self.clock, rate_limit=50)
+
+    def make_updater(self, universe, **kwargs):
+        return CacheUpdater(self.exchange, universe, clock=self.clock.time, sleep=self.clock.sleep, **kwargs)
+
+    def read(self, ticker):
+        csv_path, json_path = cache_paths('binance', ticker, '1m')
+        status = read_status(json_path)
+        return read_data(csv_path, status), status
+
+    def test_backfill_and_tail(self):
+        updater = self.make_updater([('BTC/USDT', '1m')], start=0, limit=300)
+        self.assertEqual(updater.run_once(), {('BTC/USDT', '1m'): 1000})
+        df, status = self.read('BTC/USDT')
+        # only closed candles are cached
+        self.assertEqual(list(df.open_time), [i * MINUTE for i in range(1000)])
+        self.assertEqual(status['already_downloaded'], [0, 999 * MINUTE])
+        # nothing is due before the next candle closes
+        self.clock.now += MINUTE // 2
+        self.assertEqual(updater.run_once(), {})
+        self.clock.now += 3 * MINUTE
+        n_requests = len(self.exchange.requests)
+        self.assertEqual(updater.run_once(), {('BTC/USDT', '1m'): 3})
+        self.assertEqual(len(self.exchange.requests), n_requests + 1)
+        self.assertEqual(self.exchange.requests[-1][1], 999 * MINUTE + 1)
+        df, status = self.read('BTC/USDT')
+        self.assertEqual(df.shape[0], 1003)
+        self.assertEqual(status['already_downloaded'], [0, 1002 * MINUTE])
+
+    def test_stalest_first_and_rate_limit(self):
+        self.make_updater([('ETH/USDT', '1m')], start=0).run_once()
+        self.clock.now += 10 * MINUTE
+        self.make_updater([('BTC/USDT', '1m')], start=0).run_once()
+        self.clock.now += 2 * MINUTE
+        self.exchange.requests = []
+        slept = self.clock.slept
+        updater = self.make_updater([('BTC/USDT', '1m'), ('ETH/USDT', '1m')])
+        updater.run_once()
+        self.assertEqual([r[0] for r in self.exchange.requests], ['ETH/USDT', 'BTC/USDT'])
+        # the second request waited for the rate limit
+        self.assertAlmostEqual(self.clock.slept - slept, 0.05)
+
+    def test_appended_pages_are_validated(self):
+        self.exchange = InvalidPages(clock=self.clock, missing=[500 * MINUTE, 501 * MINUTE])
+        self.make_updater([('BTC/USDT', '1m')], start=0, limit=300).run_once()
+        df, status = self.read('BTC/USDT')
+        self.assertEqual(list(df.open_time), sorted(set(range(0, 1000 * MINUTE, MINUTE)) - {500 * MINUTE, 501 * MINUTE}
+                                                    | {1000, 300 * MINUTE + 1000, 600 * MINUTE + 1000,
+                                                       900 * MINUTE + 1000}))
+        self.assertEqual(status['gaps'], [[500 * MINUTE, 501 * MINUTE]])
+        self.assertEqual(status['n_duplicates'], 4)
+        self.assertEqual(status['n_misaligned'], 4)
+        self.assertGreater(status['n_out_of_order'], 0)
+
+    def test_torn_append_is_discarded(self):
+        updater = self.make_updater([('BTC/USDT', '1m')], start=0)
+        updater.run_once()
+        csv_path, _ = cache_paths('binance', 'BTC/USDT', '1m')
+        with open(csv_path, 'a') as f:
+            f.write('12345,1.0,2')
+        df, _ = self.read('BTC/USDT')
+        self.assertEqual(df.shape[0], 1000)
+        self.clock.now += 2 * MINUTE
+        updater.run_once()
+        df, _ = self.read('BTC/USDT')
+        self.assertEqual(list(df.open_time), [i * MINUTE for i in range(1002)])
+        self.assertEqual(os.path.getsize(csv_path), read_status(cache_paths('binance', 'BTC/USDT', '1m')[1])['n_bytes'])
+
+    def test_cache_rewritten_during_fetch(self):
+        start, _ = cache_bounds('2021-01-01 12:00')
+        self.clock.now = start + 100 * MINUTE
+        updater = self.make_updater([('BTC/USDT', '1m')], start=start)
+        updater.run_once()
+        self.clock.now += 10 * MINUTE
+        self.exchange.fetch_ohlcv = BacktestDuringFetch(self.clock, '2021-01-01 06:00', '2021-01-01 08:00').fetch_ohlcv
+        self.assertEqual(updater.run_once(), {('BTC/USDT', '1m'): 10})
+        df, status = self.read('BTC/USDT')
+        early, _ = cache_bounds('2021-01-01 06:00')
+        self.assertEqual(status['already_downloaded'], [early, early + 120 * MINUTE, start, start + 109 * MINUTE])
+        self.assertEqual(list(df.open_time), list(range(early, early + 121 * MINUTE, MINUTE))
+                         + list(range(start, start + 110 * MINUTE, MINUTE)))
+
+
+if __name__ == '__main__':
+    unittest.main()